@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+
+from pathlib import Path
+import numpy as np
+from columnar_index import TRANSFORM_NAMES, columns_dir_for, load_columns
+
+# Configuration
+SIZE = 4
+GROUP_BY = ["turns.total", "symmetry.label"]
+AGGREGATES = [("min", "geometry.edges"), ("max", "geometry.edges")]
+
+# Field names follow README "JSON Records".
+FIELD_COLUMNS = {
+    "id": "id",
+    "path.length": "path_length",
+    "position.start.x": "start_x",
+    "position.start.y": "start_y",
+    "position.end.x": "end_x",
+    "position.end.y": "end_y",
+    "distance.manhattan": "manhattan",
+    "geometry.segments.min": "segments_min",
+    "geometry.segments.max": "segments_max",
+    "geometry.segments.min_count": "segments_min_count",
+    "geometry.segments.max_count": "segments_max_count",
+    "geometry.angle": "angle",
+    "geometry.edges": "edges",
+    "turns.total": "turns_total",
+    "turns.left": "turns_left",
+    "turns.right": "turns_right",
+    "turns.signed": "turns_signed",
+    "turns.longest_run": "turns_longest_run",
+    "turns.direction": "turns_direction",
+    "exposure": "exposure",
+    "symmetry.label": "symmetry_label",
+    "groups.dihedral": "groups_dihedral",
+    "groups.endpoints": "groups_endpoints",
+}
+
+AGGREGATE_FUNCTIONS = {
+    "min": np.minimum.reduceat,
+    "max": np.maximum.reduceat,
+    "sum": np.add.reduceat,
+}
+
+
+def field_values(columns, field, rows=None):
+    if field in FIELD_COLUMNS:
+        values = columns[FIELD_COLUMNS[field]]
+    elif field.startswith("symmetry.transforms."):
+        position = TRANSFORM_NAMES.index(field.rsplit(".", 1)[1])
+        values = columns["symmetry_transforms"][:, position]
+    elif field.startswith("symmetry.properties."):
+        position = TRANSFORM_NAMES.index(field.rsplit(".", 1)[1])
+        values = columns["symmetry_transforms"][:, position] == columns["id"]
+    else:
+        raise ValueError(f"Unknown field: {field}")
+
+    values = np.asarray(values)
+
+    if rows is not None:
+        values = values[rows]
+
+    return values
+
+
+def field_labels(meta, field, codes):
+    vocabulary = meta["vocabularies"].get(FIELD_COLUMNS.get(field))
+
+    if vocabulary is None:
+        return [code.item() for code in codes]
+
+    return [vocabulary[code] for code in codes]
+
+
+def group_rows(meta, columns, keys, rows=None):
+    combined = None
+    key_levels = []
+
+    for field in keys:
+        levels, inverse = np.unique(field_values(columns, field, rows), return_inverse=True)
+        key_levels.append(levels)
+        inverse = inverse.astype(np.int64)
+        combined = inverse if combined is None else combined * len(levels) + inverse
+
+    groups, group_index, counts = np.unique(combined, return_inverse=True, return_counts=True)
+    key_codes = []
+
+    for levels in reversed(key_levels):
+        key_codes.append(levels[groups % len(levels)])
+        groups = groups // len(levels)
+
+    return key_codes[::-1], group_index, counts
+
+
+def group_by(meta, columns, keys, aggregates=(), rows=None):
+    if not keys:
+        raise ValueError("group_by needs at least one key field")
+
+    for name, _ in aggregates:
+        if name != "mean" and name not in AGGREGATE_FUNCTIONS:
+            raise ValueError(f"Unknown aggregate: {name}")
+
+    key_codes, group_index, counts = group_rows(meta, columns, keys, rows)
+
+    if not len(counts):
+        return []
+
+    order = np.argsort(group_index, kind="stable")
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    results = {}
+
+    for name, field in aggregates:
+        if name == "mean":
+            values = field_values(columns, field, rows).astype(np.float64)
+            results[f"mean({field})"] = np.add.reduceat(values[order], starts) / counts
+            continue
+
+        values = field_values(columns, field, rows)
+
+        if name == "sum":
+            values = values.astype(np.int64)
+
+        results[f"{name}({field})"] = AGGREGATE_FUNCTIONS[name](values[order], starts)
+
+    labels = [field_labels(meta, field, codes) for field, codes in zip(keys, key_codes)]
+    table = []
+
+    for group in range(len(counts)):
+        entry = {field: labels[pos][group] for pos, field in enumerate(keys)}
+        entry["count"] = int(counts[group])
+
+        for name, values in results.items():
+            entry[name] = values[group].item()
+
+        table.append(entry)
+
+    return table
+
+
+def crosstab(meta, columns, row_field, column_field, rows=None):
+    (row_codes, column_codes), group_index, counts = group_rows(
+        meta, columns, [row_field, column_field], rows
+    )
+
+    row_levels, row_positions = np.unique(row_codes, return_inverse=True)
+    column_levels, column_positions = np.unique(column_codes, return_inverse=True)
+    matrix = np.zeros((len(row_levels), len(column_levels)), dtype=np.int64)
+    matrix[row_positions, column_positions] = counts
+
+    return (
+        field_labels(meta, row_field, row_levels),
+        field_labels(meta, column_field, column_levels),
+        matrix,
+    )
+
+
+if __name__ == "__main__":
+    base_dir = Path(__file__).parent.parent.parent / str(SIZE)
+    meta, columns = load_columns(columns_dir_for(base_dir, SIZE))
+
+    for entry in group_by(meta, columns, GROUP_BY, AGGREGATES):
+        print(entry)
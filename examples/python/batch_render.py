@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+from columnar_index import columns_dir_for, load_columns
+from path_store import columns_vertices
+from raster import render_sheet, write_png
+from svg_render import columns_path_ds
+
+# Configuration
+SIZE = 4
+SHEET_GRID_SIZE = 10
+OUTPUT_DIR = "sheets"
+OUTPUT_TEMPLATE = "{size}_sheet_{page:05d}.png"
+WORKERS = os.cpu_count() or 1
+PAGES_PER_TASK = 4
+BACKEND = "cairo"
+
+_worker_state = {}
+
+
+def sheet_path(output_dir, size, page):
+    return Path(output_dir) / OUTPUT_TEMPLATE.format(size=size, page=page)
+
+
+def init_worker(columns_dir):
+    meta, columns = load_columns(columns_dir, ["id", "start_x", "start_y", "moves"])
+
+    _worker_state["meta"] = meta
+    _worker_state["columns"] = columns
+
+
+def render_page(task):
+    page, rows, output_path, grid_size, backend = task
+    meta = _worker_state["meta"]
+    columns = _worker_state["columns"]
+    partial_path = output_path.with_name(output_path.name + ".partial")
+
+    if backend == "raster":
+        vertices = columns_vertices(meta, columns, rows)
+
+        write_png(partial_path, render_sheet(vertices, meta["grid_size"], grid_size, grid_size))
+    else:
+        # Imported here: tile_random_paths loads cairosvg, which the raster
+        # backend does not need.
+        from tile_random_paths import create_tiled_png
+
+        create_tiled_png(columns_path_ds(meta, columns, rows), partial_path, grid_size)
+
+    os.replace(partial_path, output_path)
+
+    return page
+
+
+def pending_pages(rows, output_dir, size, tiles_per_sheet):
+    pages = []
+
+    for page, start in enumerate(range(0, len(rows), tiles_per_sheet)):
+        output_path = sheet_path(output_dir, size, page)
+
+        if not output_path.exists():
+            pages.append((page, rows[start : start + tiles_per_sheet], output_path))
+
+    return pages
+
+
+def render_sheets(
+    columns_dir,
+    output_dir,
+    grid_size=SHEET_GRID_SIZE,
+    workers=WORKERS,
+    rows=None,
+    progress=None,
+    backend=BACKEND,
+):
+    if backend not in ("cairo", "raster"):
+        raise ValueError(f"Unknown render backend: {backend}")
+
+    meta, _ = load_columns(columns_dir, ["id"])
+    rows = np.arange(meta["count"]) if rows is None else np.asarray(rows)
+    output_dir = Path(output_dir)
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    tasks = [
+        (page, page_rows, output_path, grid_size, backend)
+        for page, page_rows, output_path in pending_pages(
+            rows, output_dir, meta["size"], grid_size * grid_size
+        )
+    ]
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=init_worker, initargs=(str(columns_dir),)
+    ) as executor:
+        for page in executor.map(render_page, tasks, chunksize=PAGES_PER_TASK):
+            if progress is not None:
+                progress(page)
+
+    return len(tasks)
+
+
+if __name__ == "__main__":
+    base_dir = Path(__file__).parent.parent.parent / str(SIZE)
+    output_dir = Path(__file__).parent / OUTPUT_DIR
+
+    rendered = render_sheets(
+        columns_dir_for(base_dir, SIZE),
+        output_dir,
+        progress=lambda page: print(f"rendered sheet {page}", flush=True),
+    )
+
+    print(f"{rendered} sheets written to {output_dir}")
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+
+import json
+from pathlib import Path
+import numpy as np
+from columnar_index import build_columnar_index, columns_dir_for, load_columns
+from query_engine import FILTER_COLUMNS, POPCOUNT_TABLE, feature_label, feature_values
+
+# Configuration
+SIZE = 4
+BITMAPS_DIR_TEMPLATE = "{size}.bitmaps"
+META_NAME = "meta.json"
+FORMAT_VERSION = 1
+
+# Roaring layout: record IDs are split into 2^16 chunks by their high bits.
+# A chunk holding at most ARRAY_LIMIT IDs is stored as a sorted uint16 array,
+# a denser chunk as a 65536-bit bitmap of 1024 uint64 words.
+CHUNK_BITS = 16
+ARRAY_LIMIT = 4096
+
+ARRAY_CONTAINER = 0
+BITMAP_CONTAINER = 1
+
+ALL_LABEL = "all"
+
+
+def bitmaps_dir_for(base_dir, size):
+    return Path(base_dir) / BITMAPS_DIR_TEMPLATE.format(size=size)
+
+
+def popcount(words):
+    return int(POPCOUNT_TABLE[np.asarray(words).view(np.uint8)].sum(dtype=np.int64))
+
+
+def lows_to_words(lows):
+    dense = np.zeros(1 << CHUNK_BITS, dtype=bool)
+    dense[lows] = True
+
+    return np.packbits(dense, bitorder="little").view("<u8")
+
+
+def words_to_lows(words):
+    dense = np.unpackbits(np.asarray(words, dtype="<u8").view(np.uint8), bitorder="little")
+
+    return np.flatnonzero(dense).astype(np.uint16)
+
+
+def make_container(lows):
+    if len(lows) > ARRAY_LIMIT:
+        return lows_to_words(lows)
+
+    return np.asarray(lows, dtype=np.uint16)
+
+
+def is_bitmap_container(container):
+    return container.dtype != np.uint16
+
+
+def container_cardinality(container):
+    if is_bitmap_container(container):
+        return popcount(container)
+
+    return len(container)
+
+
+def from_ids(ids):
+    ids = np.unique(np.asarray(ids, dtype=np.uint32))
+    highs = ids >> CHUNK_BITS
+    bounds = np.flatnonzero(np.diff(highs)) + 1
+    bitmap = {}
+
+    for chunk in np.split(ids, bounds):
+        if len(chunk):
+            high = int(chunk[0] >> CHUNK_BITS)
+            bitmap[high] = make_container((chunk & 0xFFFF).astype(np.uint16))
+
+    return bitmap
+
+
+def to_ids(bitmap):
+    parts = []
+
+    for high in sorted(bitmap):
+        container = bitmap[high]
+        lows = words_to_lows(container) if is_bitmap_container(container) else container
+
+        parts.append((np.uint32(high) << CHUNK_BITS) | lows.astype(np.uint32))
+
+    if not parts:
+        return np.zeros(0, dtype=np.uint32)
+
+    return np.concatenate(parts)
+
+
+def cardinality(bitmap):
+    return sum(container_cardinality(container) for container in bitmap.values())
+
+
+def union_containers(left, right):
+    if not is_bitmap_container(left) and not is_bitmap_container(right):
+        return make_container(np.union1d(left, right))
+
+    left_words = left if is_bitmap_container(left) else lows_to_words(left)
+    right_words = right if is_bitmap_container(right) else lows_to_words(right)
+
+    return left_words | right_words
+
+
+def intersect_containers(left, right):
+    if is_bitmap_container(left) and is_bitmap_container(right):
+        words = left & right
+
+        if popcount(words) > ARRAY_LIMIT:
+            return words
+
+        return words_to_lows(words)
+
+    if is_bitmap_container(left):
+        left, right = right, left
+
+    if is_bitmap_container(right):
+        bits = (right[left >> 6] >> (left & 63).astype("<u8")) & np.uint64(1)
+
+        return left[bits.astype(bool)]
+
+    return np.intersect1d(left, right, assume_unique=True)
+
+
+def union(left, right):
+    result = dict(left)
+
+    for high, container in right.items():
+        if high in result:
+            result[high] = union_containers(result[high], container)
+        else:
+            result[high] = container
+
+    return result
+
+
+def intersection(left, right):
+    result = {}
+
+    for high in left.keys() & right.keys():
+        container = intersect_containers(left[high], right[high])
+
+        if container_cardinality(container):
+            result[high] = container
+
+    return result
+
+
+def build_bitmap_index(meta, columns, output_dir):
+    output_dir = Path(output_dir)
+    ids = np.asarray(columns["id"])
+    labels = []
+    offsets = [0]
+    container_keys = []
+    container_kinds = []
+    container_offsets = [0]
+    blobs = []
+    entries = [(ALL_LABEL, ids)]
+
+    for key in FILTER_COLUMNS:
+        values = feature_values(columns, key)
+
+        for code in np.unique(values):
+            entries.append((f"{key}_{feature_label(meta, key, code)}", ids[values == code]))
+
+    for label, label_ids in entries:
+        bitmap = from_ids(label_ids)
+
+        for high in sorted(bitmap):
+            container = bitmap[high]
+            blob = container.view("<u2") if is_bitmap_container(container) else container
+
+            container_keys.append(high)
+            container_kinds.append(
+                BITMAP_CONTAINER if is_bitmap_container(container) else ARRAY_CONTAINER
+            )
+            container_offsets.append(container_offsets[-1] + len(blob))
+            blobs.append(blob)
+
+        labels.append(label)
+        offsets.append(len(container_keys))
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    np.save(output_dir / "bitmap_offsets.npy", np.asarray(offsets, dtype=np.int64))
+    np.save(output_dir / "container_keys.npy", np.asarray(container_keys, dtype=np.uint16))
+    np.save(output_dir / "container_kinds.npy", np.asarray(container_kinds, dtype=np.uint8))
+    np.save(output_dir / "container_offsets.npy", np.asarray(container_offsets, dtype=np.int64))
+    np.save(output_dir / "data.npy", np.concatenate(blobs).astype("<u2"))
+
+    index_meta = {
+        "version": FORMAT_VERSION,
+        "size": meta["size"],
+        "count": meta["count"],
+        "labels": labels,
+    }
+
+    with open(output_dir / META_NAME, "w", encoding="utf-8") as handle:
+        json.dump(index_meta, handle, indent=2)
+
+    return output_dir
+
+
+def load_bitmap_index(bitmaps_dir):
+    bitmaps_dir = Path(bitmaps_dir)
+
+    with open(bitmaps_dir / META_NAME, "r", encoding="utf-8") as handle:
+        meta = json.load(handle)
+
+    if meta["version"] != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported bitmap index version in {bitmaps_dir}: "
+            f"{meta['version']} != {FORMAT_VERSION}"
+        )
+
+    index = {
+        name: np.load(bitmaps_dir / f"{name}.npy", mmap_mode="r")
+        for name in (
+            "bitmap_offsets",
+            "container_keys",
+            "container_kinds",
+            "container_offsets",
+            "data",
+        )
+    }
+
+    index["meta"] = meta
+    index["label_positions"] = {label: pos for pos, label in enumerate(meta["labels"])}
+
+    return index
+
+
+def get_bitmap(index, label):
+    position = index["label_positions"].get(label)
+
+    if position is None:
+        return {}
+
+    bitmap = {}
+    first = index["bitmap_offsets"][position]
+    last = index["bitmap_offsets"][position + 1]
+
+    for container_idx in range(first, last):
+        start = index["container_offsets"][container_idx]
+        stop = index["container_offsets"][container_idx + 1]
+        blob = index["data"][start:stop]
+
+        if index["container_kinds"][container_idx] == BITMAP_CONTAINER:
+            container = np.asarray(blob).view("<u8")
+        else:
+            container = np.asarray(blob, dtype=np.uint16)
+
+        bitmap[int(index["container_keys"][container_idx])] = container
+
+    return bitmap
+
+
+def facet_bitmap(index, filters):
+    result = None
+
+    for key, allowed in filters.items():
+        if allowed is None:
+            continue
+
+        if key not in FILTER_COLUMNS:
+            raise ValueError(f"Unknown filter key: {key}")
+
+        matched = {}
+
+        for value in allowed:
+            matched = union(matched, get_bitmap(index, f"{key}_{value}"))
+
+        result = matched if result is None else intersection(result, matched)
+
+    if result is None:
+        return get_bitmap(index, ALL_LABEL)
+
+    return result
+
+
+def facet_count(index, filters):
+    return cardinality(facet_bitmap(index, filters))
+
+
+def facet_ids(index, filters):
+    return to_ids(facet_bitmap(index, filters))
+
+
+if __name__ == "__main__":
+    base_dir = Path(__file__).parent.parent.parent / str(SIZE)
+    columns_dir = columns_dir_for(base_dir, SIZE)
+
+    if not columns_dir.exists():
+        build_columnar_index(base_dir / f"{SIZE}.json", SIZE)
+
+    meta, columns = load_columns(columns_dir)
+
+    build_bitmap_index(meta, columns, bitmaps_dir_for(base_dir, SIZE))
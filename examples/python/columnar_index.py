@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+
+import json
+from pathlib import Path
+import numpy as np
+from path_store import moves_from_hex, pack_moves
+from record_stream import iter_batches
+
+# Configuration
+SIZE = 4
+COLUMNS_DIR_TEMPLATE = "{size}.columns"
+META_NAME = "meta.json"
+FORMAT_VERSION = 2
+
+SYMMETRY_LABELS = ["H", "V", "R2", "none"]
+TURN_DIRECTIONS = ["right", "left", "none"]
+EXPOSURE_CLASSES = [
+    "both_vertex",
+    "both_exposed_one_vertex",
+    "both_exposed_no_vertex",
+    "one_exposed_vertex",
+    "one_exposed_no_vertex",
+    "none_exposed",
+]
+TRANSFORM_NAMES = [
+    "mirror_h",
+    "mirror_v",
+    "rot_90",
+    "rot_180",
+    "rot_270",
+    "mirror_d",
+    "mirror_a",
+]
+
+COLUMN_DTYPES = {
+    "id": np.uint32,
+    "path_length": np.uint8,
+    "start_x": np.uint8,
+    "start_y": np.uint8,
+    "end_x": np.uint8,
+    "end_y": np.uint8,
+    "manhattan": np.uint8,
+    "turns_total": np.uint8,
+    "turns_left": np.uint8,
+    "turns_right": np.uint8,
+    "turns_signed": np.int8,
+    "turns_longest_run": np.uint8,
+    "turns_direction": np.uint8,
+    "segments_min": np.uint8,
+    "segments_max": np.uint8,
+    "segments_min_count": np.uint8,
+    "segments_max_count": np.uint8,
+    "segments_counts": np.uint8,
+    "angle": np.uint8,
+    "edges": np.uint8,
+    "exposure": np.uint8,
+    "symmetry_label": np.uint8,
+    "symmetry_transforms": np.uint32,
+    "groups_dihedral": np.uint32,
+    "groups_endpoints": np.uint32,
+    "moves": np.uint64,
+}
+
+CATEGORY_VOCABULARIES = {
+    "turns_direction": TURN_DIRECTIONS,
+    "exposure": EXPOSURE_CLASSES,
+    "symmetry_label": SYMMETRY_LABELS,
+}
+
+
+def columns_dir_for(base_dir, size):
+    return Path(base_dir) / COLUMNS_DIR_TEMPLATE.format(size=size)
+
+
+def get_path_hex(record):
+    if isinstance(record["path"], dict):
+        return record["path"]["hex"], record["path"]["length"]
+
+    return record["path"], record["pathLen"]
+
+
+def get_manhattan(record):
+    if "distance" in record:
+        return record["distance"]["manhattan"]
+
+    return record["manhattan"]
+
+
+def get_start_end(record):
+    if "position" in record:
+        start = record["position"]["start"]
+        end = record["position"]["end"]
+
+        return start["x"], start["y"], end["x"], end["y"]
+
+    return record["x"], record["y"], record["end"]["x"], record["end"]["y"]
+
+
+def category_code(vocabulary, label):
+    if label not in vocabulary:
+        raise ValueError(f"Unknown label {label!r}, expected one of {vocabulary}")
+
+    return vocabulary.index(label)
+
+
+def segment_counts(record, grid_size):
+    counts = [0] * (grid_size - 1)
+
+    for length, count in record["geometry"]["segments"]["counts"].items():
+        if not 1 <= int(length) <= grid_size - 1:
+            raise ValueError(f"Segment length {length} out of range in record {record['id']}")
+
+        counts[int(length) - 1] = count
+
+    return counts
+
+
+# record_row field by field, for salvaging a row that fails to read whole.
+# Keep in step with record_row.
+ROW_READERS = {
+    "id": lambda record, grid_size: record["id"],
+    "path_length": lambda record, grid_size: get_path_hex(record)[1],
+    "start_x": lambda record, grid_size: get_start_end(record)[0],
+    "start_y": lambda record, grid_size: get_start_end(record)[1],
+    "end_x": lambda record, grid_size: get_start_end(record)[2],
+    "end_y": lambda record, grid_size: get_start_end(record)[3],
+    "manhattan": lambda record, grid_size: get_manhattan(record),
+    "turns_total": lambda record, grid_size: record["turns"]["total"],
+    "turns_left": lambda record, grid_size: record["turns"]["left"],
+    "turns_right": lambda record, grid_size: record["turns"]["right"],
+    "turns_signed": lambda record, grid_size: record["turns"]["signed"],
+    "turns_longest_run": lambda record, grid_size: record["turns"]["longest_run"],
+    "turns_direction": lambda record, grid_size: category_code(
+        TURN_DIRECTIONS, record["turns"]["direction"]
+    ),
+    "segments_min": lambda record, grid_size: record["geometry"]["segments"]["min"],
+    "segments_max": lambda record, grid_size: record["geometry"]["segments"]["max"],
+    "segments_min_count": lambda record, grid_size: record["geometry"]["segments"]["min_count"],
+    "segments_max_count": lambda record, grid_size: record["geometry"]["segments"]["max_count"],
+    "segments_counts": segment_counts,
+    "angle": lambda record, grid_size: record["geometry"]["angle"],
+    "edges": lambda record, grid_size: record["geometry"]["edges"],
+    "exposure": lambda record, grid_size: category_code(EXPOSURE_CLASSES, record["exposure"]),
+    "symmetry_label": lambda record, grid_size: category_code(
+        SYMMETRY_LABELS, record["symmetry"]["label"]
+    ),
+    "symmetry_transforms": lambda record, grid_size: [
+        record["symmetry"]["transforms"][name] for name in TRANSFORM_NAMES
+    ],
+    "groups_dihedral": lambda record, grid_size: record["groups"]["dihedral"],
+    "groups_endpoints": lambda record, grid_size: record["groups"]["endpoints"],
+}
+
+
+def read_field(read, record, grid_size):
+    try:
+        return read(record, grid_size)
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def record_row(record, grid_size, strict=True):
+    # With strict=False a missing or malformed field reads as None and the
+    # rest of the row is still read.
+    if not strict:
+        try:
+            return record_row(record, grid_size)
+        except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+            return {name: read_field(read, record, grid_size) for name, read in ROW_READERS.items()}
+
+    _, path_len = get_path_hex(record)
+    start_x, start_y, end_x, end_y = get_start_end(record)
+    segments = record["geometry"]["segments"]
+    turns = record["turns"]
+    symmetry = record["symmetry"]
+
+    return {
+        "id": record["id"],
+        "path_length": path_len,
+        "start_x": start_x,
+        "start_y": start_y,
+        "end_x": end_x,
+        "end_y": end_y,
+        "manhattan": get_manhattan(record),
+        "turns_total": turns["total"],
+        "turns_left": turns["left"],
+        "turns_right": turns["right"],
+        "turns_signed": turns["signed"],
+        "turns_longest_run": turns["longest_run"],
+        "turns_direction": category_code(TURN_DIRECTIONS, turns["direction"]),
+        "segments_min": segments["min"],
+        "segments_max": segments["max"],
+        "segments_min_count": segments["min_count"],
+        "segments_max_count": segments["max_count"],
+        "segments_counts": segment_counts(record, grid_size),
+        "angle": record["geometry"]["angle"],
+        "edges": record["geometry"]["edges"],
+        "exposure": category_code(EXPOSURE_CLASSES, record["exposure"]),
+        "symmetry_label": category_code(SYMMETRY_LABELS, symmetry["label"]),
+        "symmetry_transforms": [symmetry["transforms"][name] for name in TRANSFORM_NAMES],
+        "groups_dihedral": record["groups"]["dihedral"],
+        "groups_endpoints": record["groups"]["endpoints"],
+    }
+
+
+def invalid_value(dtype):
+    # Stored by rows_to_columns(strict=False) for a value that is missing or
+    # does not fit its column: the dtype's largest value, or smallest if
+    # signed. No valid record field reaches either.
+    info = np.iinfo(dtype)
+
+    return info.min if info.min < 0 else info.max
+
+
+def checked_column(values, dtype, width=None):
+    info = np.iinfo(dtype)
+    invalid = invalid_value(dtype)
+
+    def fits(value):
+        return type(value) is int and info.min <= value <= info.max
+
+    if width is None:
+        return np.array([value if fits(value) else invalid for value in values], dtype=dtype)
+
+    rows = [
+        row if isinstance(row, list) and len(row) == width and all(map(fits, row)) else None
+        for row in values
+    ]
+
+    return np.array(
+        [[invalid] * width if row is None else row for row in rows], dtype=dtype
+    ).reshape(len(rows), width)
+
+
+def rows_to_columns(records, grid_size, strict=True):
+    values = {name: [] for name in ROW_READERS}
+
+    for record in records:
+        for name, value in record_row(record, grid_size, strict).items():
+            values[name].append(value)
+
+    if strict:
+        return {name: np.asarray(values[name], dtype=COLUMN_DTYPES[name]) for name in values}
+
+    widths = {"segments_counts": grid_size - 1, "symmetry_transforms": len(TRANSFORM_NAMES)}
+
+    return {
+        name: checked_column(values[name], COLUMN_DTYPES[name], widths.get(name))
+        for name in values
+    }
+
+
+def records_to_columns(records, grid_size):
+    columns = rows_to_columns(records, grid_size)
+    hex_paths = [get_path_hex(record)[0] for record in records]
+    columns["moves"] = pack_moves(moves_from_hex(hex_paths, grid_size**2 - 1))
+
+    return columns
+
+
+def save_columns(columns, size, output_dir):
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    for name in COLUMN_DTYPES:
+        np.save(output_dir / f"{name}.npy", np.asarray(columns[name], dtype=COLUMN_DTYPES[name]))
+
+    meta = {
+        "version": FORMAT_VERSION,
+        "size": size,
+        "grid_size": size + 2,
+        "count": len(columns["id"]),
+        "moves_encoding": "first_move_base3_turns",
+        "columns": list(COLUMN_DTYPES),
+        "vocabularies": CATEGORY_VOCABULARIES,
+        "transforms": TRANSFORM_NAMES,
+    }
+
+    with open(output_dir / META_NAME, "w", encoding="utf-8") as handle:
+        json.dump(meta, handle, indent=2)
+
+    return output_dir
+
+
+def build_columnar_index(json_path, size, output_dir=None):
+    json_path = Path(json_path)
+    output_dir = Path(output_dir or columns_dir_for(json_path.parent, size))
+    grid_size = size + 2
+
+    batches = [records_to_columns(batch, grid_size) for batch in iter_batches(json_path)]
+    batches = batches or [records_to_columns([], grid_size)]
+    order = np.argsort(np.concatenate([batch["id"] for batch in batches]), kind="stable")
+    columns = {
+        name: np.concatenate([batch[name] for batch in batches])[order] for name in COLUMN_DTYPES
+    }
+
+    return save_columns(columns, size, output_dir)
+
+
+def load_columns(columns_dir, names=None):
+    columns_dir = Path(columns_dir)
+
+    with open(columns_dir / META_NAME, "r", encoding="utf-8") as handle:
+        meta = json.load(handle)
+
+    if meta["version"] != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported columnar index version in {columns_dir}: "
+            f"{meta['version']} != {FORMAT_VERSION}"
+        )
+
+    columns = {
+        name: np.load(columns_dir / f"{name}.npy", mmap_mode="r")
+        for name in (names or meta["columns"])
+    }
+
+    return meta, columns
+
+
+def decode_category(meta, name, codes):
+    vocabulary = meta["vocabularies"][name]
+
+    return [vocabulary[code] for code in codes]
+
+
+if __name__ == "__main__":
+    base_dir = Path(__file__).parent.parent.parent / str(SIZE)
+    json_path = base_dir / f"{SIZE}.json"
+
+    build_columnar_index(json_path, SIZE)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+import numpy as np
+from columnar_index import SYMMETRY_LABELS, TRANSFORM_NAMES
+from features import is_canonical
+from path_store import DIRECTION_VECTORS, pack_moves
+
+D4_NAMES = ["identity"] + TRANSFORM_NAMES
+
+# Point maps (x, y) -> (a*x + b*y + ox*m, c*x + d*y + oy*m) with m = n - 1,
+# matching the transforms recorded in symmetry.transforms.
+D4_MAPS = {
+    "identity": ((1, 0, 0, 1), (0, 0)),
+    "mirror_h": ((1, 0, 0, -1), (0, 1)),
+    "mirror_v": ((-1, 0, 0, 1), (1, 0)),
+    "rot_90": ((0, -1, 1, 0), (1, 0)),
+    "rot_180": ((-1, 0, 0, -1), (1, 1)),
+    "rot_270": ((0, 1, -1, 0), (0, 1)),
+    "mirror_d": ((0, 1, 1, 0), (0, 0)),
+    "mirror_a": ((0, -1, -1, 0), (1, 1)),
+}
+
+
+def build_direction_tables():
+    vectors = [tuple(vec) for vec in DIRECTION_VECTORS.tolist()]
+    tables = np.zeros((len(D4_NAMES), 4), dtype=np.uint8)
+
+    for idx, name in enumerate(D4_NAMES):
+        (a, b, c, d), _ = D4_MAPS[name]
+
+        for direction, (x, y) in enumerate(vectors):
+            tables[idx, direction] = vectors.index((a * x + b * y, c * x + d * y))
+
+    return tables
+
+
+DIRECTION_TABLES = build_direction_tables()
+
+
+def transform_points(x, y, name, grid_size):
+    (a, b, c, d), (ox, oy) = D4_MAPS[name]
+    x = np.asarray(x, dtype=np.int64)
+    y = np.asarray(y, dtype=np.int64)
+    m = grid_size - 1
+
+    return a * x + b * y + ox * m, c * x + d * y + oy * m
+
+
+def transform_moves(moves, name):
+    return DIRECTION_TABLES[D4_NAMES.index(name)][np.asarray(moves)]
+
+
+def canonical_orientation(moves, start_x, start_y, end_x, end_y):
+    moves = np.asarray(moves, dtype=np.uint8)
+    keep = is_canonical(moves)
+    reverse = (moves[:, ::-1] + 2) % 4
+
+    return (
+        np.where(keep[:, None], moves, reverse).astype(np.uint8),
+        np.where(keep, start_x, end_x),
+        np.where(keep, start_y, end_y),
+    )
+
+
+def transform_paths(moves, start_x, start_y, end_x, end_y, name, grid_size):
+    sx, sy = transform_points(start_x, start_y, name, grid_size)
+    ex, ey = transform_points(end_x, end_y, name, grid_size)
+
+    return canonical_orientation(transform_moves(moves, name), sx, sy, ex, ey)
+
+
+def path_keys(moves, start_x, start_y, grid_size):
+    return packed_path_keys(pack_moves(moves), start_x, start_y, grid_size)
+
+
+def packed_path_keys(packed, start_x, start_y, grid_size):
+    cells = np.asarray(start_y, dtype=np.uint64) * grid_size + np.asarray(start_x)
+    keys = np.ascontiguousarray(np.column_stack([packed, cells.astype(np.uint64)]))
+
+    return keys.view(np.dtype((np.void, keys.dtype.itemsize * keys.shape[1]))).ravel()
+
+
+def build_key_lookup(keys, ids):
+    order = np.argsort(keys)
+
+    return keys[order], np.asarray(ids)[order]
+
+
+def lookup_ids(lookup, keys):
+    sorted_keys, sorted_ids = lookup
+    positions = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    found = sorted_keys[positions] == keys
+
+    return np.where(found, sorted_ids[positions].astype(np.int64), -1)
+
+
+def symmetry_transforms(moves, vertices, ids, grid_size):
+    vertices = np.asarray(vertices)
+    start_x, start_y = vertices[:, 0, 0], vertices[:, 0, 1]
+    end_x, end_y = vertices[:, -1, 0], vertices[:, -1, 1]
+    lookup = build_key_lookup(path_keys(moves, start_x, start_y, grid_size), ids)
+    transforms = np.zeros((len(ids), len(TRANSFORM_NAMES)), dtype=np.int64)
+
+    for position, name in enumerate(TRANSFORM_NAMES):
+        images = transform_paths(moves, start_x, start_y, end_x, end_y, name, grid_size)
+        transforms[:, position] = lookup_ids(lookup, path_keys(*images, grid_size))
+
+    return transforms
+
+
+def symmetry_properties(transforms, ids):
+    return np.asarray(transforms) == np.asarray(ids)[:, None]
+
+
+def symmetry_labels(properties):
+    return np.select(
+        [
+            properties[:, TRANSFORM_NAMES.index("mirror_h")],
+            properties[:, TRANSFORM_NAMES.index("mirror_v")],
+            properties[:, TRANSFORM_NAMES.index("rot_180")],
+        ],
+        [SYMMETRY_LABELS.index("H"), SYMMETRY_LABELS.index("V"), SYMMETRY_LABELS.index("R2")],
+        default=SYMMETRY_LABELS.index("none"),
+    )
+
+
+def dihedral_orbit_min(transforms, ids):
+    return np.minimum(np.asarray(ids), np.asarray(transforms).min(axis=1))
+
+
+def dihedral_classes(transforms, ids):
+    _, classes = np.unique(dihedral_orbit_min(transforms, ids), return_inverse=True)
+
+    return classes
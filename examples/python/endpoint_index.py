@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+
+import json
+import time
+from pathlib import Path
+import numpy as np
+from columnar_index import build_columnar_index, columns_dir_for, load_columns
+from d4 import D4_NAMES, transform_points
+
+# Configuration
+SIZE = 4
+ENDPOINTS_DIR_TEMPLATE = "{size}.endpoints"
+META_NAME = "meta.json"
+FORMAT_VERSION = 1
+QUERY_START = (0, 0)
+QUERY_END = (0, 1)
+
+# CSR layout over vertex v = y * n + x. A path is undirected, so the pair key
+# is min(v, w) * n^2 + max(v, w) and each path is listed under both of its
+# endpoints in the vertex index. IDs are sorted within every range.
+INDEX_ARRAYS = ["pair_offsets", "pair_ids", "vertex_offsets", "vertex_ids", "group_pairs"]
+
+
+def endpoints_dir_for(base_dir, size):
+    return Path(base_dir) / ENDPOINTS_DIR_TEMPLATE.format(size=size)
+
+
+def vertex_index(x, y, grid_size):
+    # Row-major: vertex (x, y) is y * n + x.
+    x, y = np.asarray(x, dtype=np.int64), np.asarray(y, dtype=np.int64)
+
+    if ((x < 0) | (x >= grid_size) | (y < 0) | (y >= grid_size)).any():
+        raise ValueError(f"Vertex outside the {grid_size}x{grid_size} grid")
+
+    return y * grid_size + x
+
+
+def pair_keys(start_x, start_y, end_x, end_y, grid_size):
+    starts = vertex_index(start_x, start_y, grid_size)
+    ends = vertex_index(end_x, end_y, grid_size)
+
+    return np.minimum(starts, ends) * grid_size * grid_size + np.maximum(starts, ends)
+
+
+def csr(keys, ids, key_count):
+    order = np.lexsort((ids, keys))
+    offsets = np.searchsorted(keys[order], np.arange(key_count + 1)).astype(np.uint64)
+
+    return offsets, np.asarray(ids)[order].astype(np.uint32)
+
+
+def build_endpoint_index(meta, columns, output_dir):
+    output_dir = Path(output_dir)
+    grid_size = meta["grid_size"]
+    vertices = grid_size * grid_size
+    ids = np.asarray(columns["id"], dtype=np.int64)
+    start_x, start_y = np.asarray(columns["start_x"]), np.asarray(columns["start_y"])
+    end_x, end_y = np.asarray(columns["end_x"]), np.asarray(columns["end_y"])
+    keys = pair_keys(start_x, start_y, end_x, end_y, grid_size)
+    groups = np.asarray(columns["groups_endpoints"], dtype=np.int64)
+
+    group_pairs = np.zeros(groups.max() + 1 if len(groups) else 0, dtype=np.uint32)
+    group_pairs[groups] = keys
+
+    if (group_pairs[groups] != keys).any():
+        raise ValueError("groups.endpoints mixes paths with different endpoint pairs")
+
+    pair_offsets, pair_ids = csr(keys, ids, vertices * vertices)
+    vertex_offsets, vertex_ids = csr(
+        np.concatenate(
+            [vertex_index(start_x, start_y, grid_size), vertex_index(end_x, end_y, grid_size)]
+        ),
+        np.concatenate([ids, ids]),
+        vertices,
+    )
+
+    arrays = {
+        "pair_offsets": pair_offsets,
+        "pair_ids": pair_ids,
+        "vertex_offsets": vertex_offsets,
+        "vertex_ids": vertex_ids,
+        "group_pairs": group_pairs,
+    }
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    for name in INDEX_ARRAYS:
+        np.save(output_dir / f"{name}.npy", arrays[name])
+
+    index_meta = {
+        "version": FORMAT_VERSION,
+        "size": meta["size"],
+        "grid_size": grid_size,
+        "count": meta["count"],
+        "groups": len(group_pairs),
+    }
+
+    with open(output_dir / META_NAME, "w", encoding="utf-8") as handle:
+        json.dump(index_meta, handle, indent=2)
+
+    return output_dir
+
+
+def load_endpoint_index(endpoints_dir):
+    endpoints_dir = Path(endpoints_dir)
+
+    with open(endpoints_dir / META_NAME, "r", encoding="utf-8") as handle:
+        meta = json.load(handle)
+
+    if meta["version"] != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported endpoint index version in {endpoints_dir}: "
+            f"{meta['version']} != {FORMAT_VERSION}"
+        )
+
+    index = {
+        name: np.load(endpoints_dir / f"{name}.npy", mmap_mode="r") for name in INDEX_ARRAYS
+    }
+    index["meta"] = meta
+
+    return index
+
+
+def pair_ranges(index, start_x, start_y, end_x, end_y):
+    # Vectorized: one (low, high) slice of pair_ids per queried pair.
+    keys = pair_keys(start_x, start_y, end_x, end_y, index["meta"]["grid_size"])
+    offsets = index["pair_offsets"]
+
+    return offsets[keys].astype(np.int64), offsets[keys + 1].astype(np.int64)
+
+
+def pair_counts(index, start_x, start_y, end_x, end_y):
+    low, high = pair_ranges(index, start_x, start_y, end_x, end_y)
+
+    return high - low
+
+
+def pair_ids(index, start, end):
+    low, high = pair_ranges(index, start[0], start[1], end[0], end[1])
+
+    return index["pair_ids"][int(low) : int(high)]
+
+
+def vertex_ids(index, vertex):
+    vertex = int(vertex_index(vertex[0], vertex[1], index["meta"]["grid_size"]))
+    offsets = index["vertex_offsets"]
+
+    return index["vertex_ids"][int(offsets[vertex]) : int(offsets[vertex + 1])]
+
+
+def d4_pairs(start, end, grid_size):
+    pairs = set()
+
+    for name in D4_NAMES:
+        sx, sy = transform_points(start[0], start[1], name, grid_size)
+        ex, ey = transform_points(end[0], end[1], name, grid_size)
+        pairs.add(int(pair_keys(sx, sy, ex, ey, grid_size)))
+
+    return sorted(pairs)
+
+
+def d4_pair_ids(index, start, end):
+    # Paths whose endpoint pair is any D4 image of (start, end).
+    grid_size = index["meta"]["grid_size"]
+    offsets = index["pair_offsets"]
+    ranges = [
+        index["pair_ids"][int(offsets[key]) : int(offsets[key + 1])]
+        for key in d4_pairs(start, end, grid_size)
+    ]
+
+    return np.sort(np.concatenate(ranges))
+
+
+def group_ids(index, group):
+    if not 0 <= group < len(index["group_pairs"]):
+        raise ValueError(f"Unknown groups.endpoints value: {group}")
+
+    key = int(index["group_pairs"][group])
+    offsets = index["pair_offsets"]
+
+    return index["pair_ids"][int(offsets[key]) : int(offsets[key + 1])]
+
+
+def pair_count_matrix(index):
+    # counts[v, w] = number of paths between vertices v and w (symmetric).
+    vertices = index["meta"]["grid_size"] ** 2
+    counts = np.diff(np.asarray(index["pair_offsets"], dtype=np.int64)).reshape(
+        vertices, vertices
+    )
+
+    return counts + counts.T - np.diag(np.diag(counts))
+
+
+def vertex_count_grid(index):
+    # grid[y, x] = number of paths with an endpoint at (x, y), for heatmaps.
+    grid_size = index["meta"]["grid_size"]
+
+    return np.diff(np.asarray(index["vertex_offsets"], dtype=np.int64)).reshape(
+        grid_size, grid_size
+    )
+
+
+if __name__ == "__main__":
+    base_dir = Path(__file__).parent.parent.parent / str(SIZE)
+    endpoints_dir = endpoints_dir_for(base_dir, SIZE)
+
+    if not endpoints_dir.exists():
+        columns_dir = columns_dir_for(base_dir, SIZE)
+
+        if not columns_dir.exists():
+            build_columnar_index(base_dir / f"{SIZE}.json", SIZE)
+
+        meta, columns = load_columns(columns_dir)
+        build_endpoint_index(meta, columns, endpoints_dir)
+
+    index = load_endpoint_index(endpoints_dir)
+
+    started = time.perf_counter()
+    ids = pair_ids(index, QUERY_START, QUERY_END)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    print(f"{len(ids)} paths between {QUERY_START} and {QUERY_END} ({elapsed:.3f} ms)")
+    print(f"{len(d4_pair_ids(index, QUERY_START, QUERY_END))} including D4 images")
+    print(vertex_count_grid(index))
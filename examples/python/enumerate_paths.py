@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+from columnar_index import (
+    EXPOSURE_CLASSES,
+    SYMMETRY_LABELS,
+    TRANSFORM_NAMES,
+    TURN_DIRECTIONS,
+    save_columns,
+)
+from d4 import (
+    build_key_lookup,
+    dihedral_classes,
+    lookup_ids,
+    packed_path_keys,
+    path_keys,
+    symmetry_labels,
+    symmetry_properties,
+    transform_paths,
+)
+from features import derived_columns, segment_lengths
+from path_store import (
+    DIRECTION_VECTORS,
+    moves_from_hex,
+    moves_to_hex,
+    moves_to_vertices,
+    pack_moves,
+    unpack_moves,
+)
+
+# Configuration
+SIZE = 4
+OUTPUT_DIR = Path(__file__).parent / "generated"
+WORKERS = os.cpu_count() or 1
+PREFIX_DEPTH = 6
+CHUNK_ROWS = 100000
+WRITE_JSON = True
+
+# Path counts shipped in this repository (README "Scope"), plus 7x7.
+EXPECTED_COUNTS = {0: 4, 1: 20, 2: 276, 3: 4324, 4: 229348, 5: 13535280}
+
+# Record IDs follow a depth-first enumeration: start vertices in row-major
+# order, moves tried in the order 0=right, 1=down, 2=left, 3=up, and each
+# path numbered where it is first reached. A path is reached once from each
+# end, and the start with the lower row-major index comes first, so the
+# search keeps only walks that end on a higher-index vertex.
+
+
+def grid_tables(grid_size):
+    cells = grid_size * grid_size
+    neighbors = []
+
+    for cell in range(cells):
+        x, y = cell % grid_size, cell // grid_size
+        cell_neighbors = []
+
+        for direction, (dx, dy) in enumerate(DIRECTION_VECTORS.tolist()):
+            nx, ny = x + dx, y + dy
+
+            if 0 <= nx < grid_size and 0 <= ny < grid_size:
+                cell_neighbors.append((direction, ny * grid_size + nx))
+
+        neighbors.append(tuple(cell_neighbors))
+
+    masks = [sum(1 << other for _, other in cell_neighbors) for cell_neighbors in neighbors]
+    even = sum(
+        1 << cell for cell in range(cells) if (cell % grid_size + cell // grid_size) % 2 == 0
+    )
+    first_column = sum(1 << (row * grid_size) for row in range(grid_size))
+    last_column = first_column << (grid_size - 1)
+
+    return {
+        "grid_size": grid_size,
+        "cells": cells,
+        "full": (1 << cells) - 1,
+        "neighbors": neighbors,
+        "masks": masks,
+        "even": even,
+        "first_column": first_column,
+        "last_column": last_column,
+    }
+
+
+def start_cells(tables):
+    grid_size = tables["grid_size"]
+    cells = range(tables["cells"])
+
+    # On an odd grid both ends of a Hamiltonian path lie on the majority colour.
+    if grid_size % 2 == 1:
+        return [cell for cell in cells if tables["even"] >> cell & 1]
+
+    return list(cells)
+
+
+def is_connected(tables, unvisited):
+    if not unvisited:
+        return True
+
+    grid_size = tables["grid_size"]
+    not_first = ~tables["first_column"]
+    not_last = ~tables["last_column"]
+    filled = unvisited & -unvisited
+
+    while True:
+        grown = (
+            filled
+            | ((filled << 1) & not_first)
+            | ((filled >> 1) & not_last)
+            | (filled << grid_size)
+            | (filled >> grid_size)
+        ) & unvisited
+
+        if grown == filled:
+            return filled == unvisited
+
+        filled = grown
+
+
+def initial_state(tables, start):
+    visited = 1 << start
+    unvisited = tables["full"] & ~visited
+    forced = 0
+
+    for cell in range(tables["cells"]):
+        if cell == start:
+            continue
+
+        degree = (tables["masks"][cell] & unvisited).bit_count()
+        degree += tables["masks"][start] >> cell & 1
+
+        if degree <= 1:
+            forced |= 1 << cell
+
+    return (start, visited, start, forced, 0, 0, 1, tables["cells"] - 1)
+
+
+def walk(tables, state, stop_remaining, sink):
+    start, visited, head, forced, forward, backward, weight, remaining = state
+    start_bit = 1 << start
+    full = tables["full"]
+    neighbors = tables["neighbors"]
+    masks = tables["masks"]
+    even = tables["even"]
+
+    # forward is the move string read as a base-4 number; backward is the
+    # reversed, direction-flipped string, built from its low digits upwards.
+    def step(visited, head, forced, forward, backward, weight, remaining):
+        if remaining == stop_remaining:
+            sink((start, visited, head, forced, forward, backward, weight, remaining))
+            return
+
+        if remaining == 0:
+            sink((forward, backward, head))
+            return
+
+        for direction, cell in neighbors[head]:
+            bit = 1 << cell
+
+            if visited & bit:
+                continue
+
+            unvisited = full & ~(visited | bit)
+            next_forced = forced & ~bit
+            dead = False
+
+            # Only the old head's free neighbours lose a possible connection.
+            for _, other in neighbors[head]:
+                other_bit = 1 << other
+
+                if other == cell or visited & other_bit:
+                    continue
+
+                degree = (masks[other] & unvisited).bit_count() + (masks[cell] >> other & 1)
+
+                if degree == 0:
+                    dead = True
+                    break
+
+                if degree == 1:
+                    next_forced |= other_bit
+
+            if dead:
+                continue
+
+            if next_forced:
+                # Two forced ends, or a forced end the other walk reaches first.
+                if next_forced & (next_forced - 1) or next_forced < start_bit:
+                    continue
+
+            if unvisited:
+                same = even if even >> cell & 1 else full & ~even
+                balance = (unvisited & ~same).bit_count() - (unvisited & same).bit_count()
+
+                if balance not in (0, 1):
+                    continue
+
+                if not is_connected(tables, unvisited):
+                    continue
+            elif cell < start:
+                continue
+
+            step(
+                visited | bit,
+                cell,
+                next_forced,
+                forward * 4 + direction,
+                backward + ((direction + 2) & 3) * weight,
+                weight * 4,
+                remaining - 1,
+            )
+
+    step(visited, head, forced, forward, backward, weight, remaining)
+
+
+def prefix_tasks(tables, depth=PREFIX_DEPTH):
+    tasks = []
+    stop = max(tables["cells"] - 1 - depth, 0)
+
+    for start in start_cells(tables):
+        walk(tables, initial_state(tables, start), stop, tasks.append)
+
+    return tasks
+
+
+def canonical_paths(grid_size, found):
+    # The stored string is the smaller of f and g (README "Canonical
+    # Orientation"); g starts from the walk's end vertex.
+    path_len = grid_size * grid_size - 1
+    hex_paths = []
+    starts = []
+
+    for start, forward, backward, end in found:
+        if forward < backward:
+            hex_paths.append(format(forward, "x"))
+            starts.append(start)
+        else:
+            hex_paths.append(format(backward, "x"))
+            starts.append(end)
+
+    if not hex_paths:
+        return np.zeros((0, 1), dtype=np.uint64), np.zeros(0, dtype=np.uint16)
+
+    moves = moves_from_hex(hex_paths, path_len)
+
+    return pack_moves(moves), np.asarray(starts, dtype=np.uint16)
+
+
+def complete_task(task):
+    grid_size, state = task
+    tables = grid_tables(grid_size)
+    found = []
+
+    walk(tables, state, -1, lambda result: found.append((state[0],) + result))
+
+    return canonical_paths(grid_size, found)
+
+
+def enumerate_paths(size, workers=WORKERS, progress=True):
+    grid_size = size + 2
+    tables = grid_tables(grid_size)
+    tasks = [(grid_size, state) for state in prefix_tasks(tables)]
+    packed = []
+    starts = []
+    started = time.time()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for done, (task_packed, task_starts) in enumerate(
+            executor.map(complete_task, tasks, chunksize=max(1, len(tasks) // (workers * 16)))
+        ):
+            packed.append(task_packed)
+            starts.append(task_starts)
+
+            if progress and (done + 1) % 1000 == 0:
+                found = sum(len(chunk) for chunk in starts)
+                print(
+                    f"{done + 1}/{len(tasks)} prefixes, {found} paths, "
+                    f"{time.time() - started:.0f}s",
+                    file=sys.stderr,
+                )
+
+    words = max((chunk.shape[1] for chunk in packed), default=1)
+    packed = np.concatenate(
+        [chunk for chunk in packed if len(chunk)] or [np.zeros((0, words), dtype=np.uint64)]
+    )
+    starts = np.concatenate(starts) if starts else np.zeros(0, dtype=np.uint16)
+
+    return packed, starts % grid_size, starts // grid_size
+
+
+def endpoint_classes(start_x, start_y, end_x, end_y, grid_size):
+    starts = np.asarray(start_y, dtype=np.int64) * grid_size + start_x
+    ends = np.asarray(end_y, dtype=np.int64) * grid_size + end_x
+    pairs = np.minimum(starts, ends) * grid_size * grid_size + np.maximum(starts, ends)
+    _, first, inverse = np.unique(pairs, return_index=True, return_inverse=True)
+    ranks = np.empty(len(first), dtype=np.int64)
+    ranks[np.argsort(first, kind="stable")] = np.arange(len(first))
+
+    return ranks[inverse]
+
+
+def build_columns(packed, start_x, start_y, grid_size, chunk_rows=CHUNK_ROWS):
+    count = len(packed)
+    path_len = grid_size * grid_size - 1
+    ids = np.arange(count, dtype=np.int64)
+    lookup = build_key_lookup(packed_path_keys(packed, start_x, start_y, grid_size), ids)
+    chunks = []
+
+    for start in range(0, count, chunk_rows):
+        rows = slice(start, min(start + chunk_rows, count))
+        moves = unpack_moves(packed[rows], path_len)
+        vertices = moves_to_vertices(start_x[rows], start_y[rows], moves)
+        chunk = derived_columns(moves, vertices, grid_size)
+        transforms = np.zeros((len(moves), len(TRANSFORM_NAMES)), dtype=np.int64)
+
+        for position, name in enumerate(TRANSFORM_NAMES):
+            images = transform_paths(
+                moves,
+                start_x[rows],
+                start_y[rows],
+                chunk["end_x"],
+                chunk["end_y"],
+                name,
+                grid_size,
+            )
+            transforms[:, position] = lookup_ids(lookup, path_keys(*images, grid_size))
+
+        chunk["symmetry_transforms"] = transforms
+        chunks.append(chunk)
+
+    columns = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+    columns["id"] = ids
+    columns["path_length"] = np.full(count, path_len)
+    columns["start_x"] = start_x
+    columns["start_y"] = start_y
+    columns["moves"] = packed
+    columns["symmetry_label"] = symmetry_labels(
+        symmetry_properties(columns["symmetry_transforms"], ids)
+    )
+    columns["groups_dihedral"] = dihedral_classes(columns["symmetry_transforms"], ids)
+    columns["groups_endpoints"] = endpoint_classes(
+        start_x, start_y, columns["end_x"], columns["end_y"], grid_size
+    )
+
+    return columns
+
+
+def column_records(columns, grid_size, chunk_rows=CHUNK_ROWS):
+    count = len(columns["id"])
+    path_len = grid_size * grid_size - 1
+
+    for start in range(0, count, chunk_rows):
+        rows = slice(start, min(start + chunk_rows, count))
+        moves = unpack_moves(columns["moves"][rows], path_len)
+        lengths, owners = segment_lengths(moves)
+        lengths = np.split(lengths, np.searchsorted(owners, np.arange(1, len(moves))))
+        values = {
+            name: np.asarray(column[rows]).tolist()
+            for name, column in columns.items()
+            if name != "moves"
+        }
+
+        for offset, path_hex in enumerate(moves_to_hex(moves)):
+            row = {name: column[offset] for name, column in values.items()}
+            segments = lengths[offset].tolist()
+            counts = {}
+
+            for length in segments:
+                counts[str(length)] = counts.get(str(length), 0) + 1
+
+            yield {
+                "id": row["id"],
+                "path": {"hex": path_hex, "length": row["path_length"]},
+                "position": {
+                    "start": {"x": row["start_x"], "y": row["start_y"]},
+                    "end": {"x": row["end_x"], "y": row["end_y"]},
+                },
+                "distance": {"manhattan": row["manhattan"]},
+                "geometry": {
+                    "segments": {
+                        "lengths": segments,
+                        "min": row["segments_min"],
+                        "max": row["segments_max"],
+                        "counts": counts,
+                        "min_count": row["segments_min_count"],
+                        "max_count": row["segments_max_count"],
+                    },
+                    "angle": row["angle"],
+                    "edges": row["edges"],
+                },
+                "turns": {
+                    "total": row["turns_total"],
+                    "left": row["turns_left"],
+                    "right": row["turns_right"],
+                    "signed": row["turns_signed"],
+                    "longest_run": row["turns_longest_run"],
+                    "direction": TURN_DIRECTIONS[row["turns_direction"]],
+                },
+                "exposure": EXPOSURE_CLASSES[row["exposure"]],
+                "symmetry": {
+                    "transforms": dict(zip(TRANSFORM_NAMES, row["symmetry_transforms"])),
+                    "properties": {
+                        name: record_id == row["id"]
+                        for name, record_id in zip(TRANSFORM_NAMES, row["symmetry_transforms"])
+                    },
+                    "label": SYMMETRY_LABELS[row["symmetry_label"]],
+                },
+                "groups": {
+                    "dihedral": row["groups_dihedral"],
+                    "endpoints": row["groups_endpoints"],
+                },
+            }
+
+
+def write_json(columns, grid_size, json_path):
+    # Streams one record at a time in the README layout, so the 7x7 dataset
+    # never has to exist as a Python list.
+    json_path = Path(json_path)
+    json_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(json_path, "w", encoding="utf-8") as handle:
+        handle.write("[")
+
+        for position, record in enumerate(column_records(columns, grid_size)):
+            handle.write(", " if position else "")
+            handle.write(json.dumps(record))
+
+        handle.write("]")
+
+    return json_path
+
+
+def generate_dataset(size, output_dir=OUTPUT_DIR, workers=WORKERS, write_json_file=WRITE_JSON):
+    grid_size = size + 2
+    output_dir = Path(output_dir) / str(size)
+    packed, start_x, start_y = enumerate_paths(size, workers)
+    columns = build_columns(packed, start_x, start_y, grid_size)
+
+    save_columns(columns, size, output_dir / f"{size}.columns")
+
+    if write_json_file:
+        write_json(columns, grid_size, output_dir / f"{size}.json")
+
+    return columns
+
+
+if __name__ == "__main__":
+    started = time.time()
+    columns = generate_dataset(SIZE)
+    count = len(columns["id"])
+    expected = EXPECTED_COUNTS.get(SIZE)
+
+    print(f"{count} paths for {SIZE + 2}x{SIZE + 2} in {time.time() - started:.1f}s")
+
+    if expected is not None and count != expected:
+        print(f"Expected {expected} paths for size {SIZE}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+
+import numpy as np
+from columnar_index import EXPOSURE_CLASSES, TURN_DIRECTIONS
+from path_store import DIRECTION_VECTORS
+
+# Derived fields follow the per-step definitions in README "JSON Records",
+# evaluated column by column so every record of a size is handled at once.
+RIGHT_TURN = 1
+REVERSE = 2
+LEFT_TURN = 3
+
+
+def turn_deltas(moves):
+    moves = np.asarray(moves, dtype=np.int16)
+
+    return (moves[:, 1:] - moves[:, :-1]) % 4
+
+
+def turn_counts(moves):
+    deltas = turn_deltas(moves)
+    right = (deltas == RIGHT_TURN).sum(axis=1)
+    left = (deltas == LEFT_TURN).sum(axis=1)
+
+    return right + left, left, right, right - left
+
+
+def turn_direction(signed):
+    codes = np.full(len(signed), TURN_DIRECTIONS.index("none"), dtype=np.uint8)
+    codes[signed > 0] = TURN_DIRECTIONS.index("right")
+    codes[signed < 0] = TURN_DIRECTIONS.index("left")
+
+    return codes
+
+
+def longest_turn_run(moves):
+    deltas = turn_deltas(moves)
+    count = deltas.shape[0]
+    sense = np.zeros(count, dtype=np.int16)
+    run = np.zeros(count, dtype=np.int16)
+    longest = np.zeros(count, dtype=np.int16)
+
+    for col in range(deltas.shape[1]):
+        delta = deltas[:, col]
+        turning = (delta == RIGHT_TURN) | (delta == LEFT_TURN)
+        run = np.where(turning, np.where(delta == sense, run + 1, 1), run)
+        sense = np.where(turning, delta, sense)
+        run = np.where(delta == REVERSE, 0, run)
+        sense = np.where(delta == REVERSE, 0, sense)
+        longest = np.maximum(longest, run)
+
+    return longest
+
+
+def segment_starts(moves):
+    moves = np.asarray(moves)
+    count, path_len = moves.shape
+    starts = np.ones((count, path_len + 1), dtype=bool)
+    starts[:, 1:path_len] = moves[:, 1:] != moves[:, :-1]
+
+    return starts
+
+
+def segment_lengths(moves):
+    rows, cols = np.nonzero(segment_starts(moves))
+    same_row = rows[1:] == rows[:-1]
+    lengths = np.diff(cols)[same_row]
+    owners = rows[:-1][same_row]
+
+    return lengths, owners
+
+
+def segment_histogram(moves, grid_size):
+    lengths, owners = segment_lengths(moves)
+    counts = np.zeros((len(moves), grid_size - 1), dtype=np.int64)
+    np.add.at(counts, (owners, lengths - 1), 1)
+
+    return counts
+
+
+def segment_summary(counts):
+    present = counts > 0
+    width = counts.shape[1]
+    minimum = present.argmax(axis=1) + 1
+    maximum = width - present[:, ::-1].argmax(axis=1)
+    rows = np.arange(len(counts))
+
+    return minimum, maximum, counts[rows, minimum - 1], counts[rows, maximum - 1]
+
+
+def end_angle(moves):
+    moves = np.asarray(moves)
+    first = DIRECTION_VECTORS[moves[:, 0]].astype(np.int16)
+    last = DIRECTION_VECTORS[moves[:, -1]].astype(np.int16)
+
+    return 1 - (first * last).sum(axis=1)
+
+
+def on_boundary(vertices, grid_size):
+    vertices = np.asarray(vertices)
+
+    return ((vertices == 0) | (vertices == grid_size - 1)).any(axis=-1)
+
+
+def on_corner(vertices, grid_size):
+    vertices = np.asarray(vertices)
+
+    return ((vertices == 0) | (vertices == grid_size - 1)).all(axis=-1)
+
+
+def edge_touches(vertices, grid_size):
+    boundary = on_boundary(vertices, grid_size)
+    steps = boundary[:, :-1] | boundary[:, 1:]
+
+    return boundary[:, 0].astype(np.int64) + boundary[:, -1] + steps.sum(axis=1)
+
+
+def exposure_class(vertices, grid_size):
+    vertices = np.asarray(vertices)
+    endpoints = vertices[:, [0, -1]]
+    exposed = on_boundary(endpoints, grid_size).sum(axis=1)
+    corners = on_corner(endpoints, grid_size).sum(axis=1)
+    conditions = [
+        ("both_vertex", corners == 2),
+        ("both_exposed_one_vertex", (exposed == 2) & (corners == 1)),
+        ("both_exposed_no_vertex", exposed == 2),
+        ("one_exposed_vertex", (exposed == 1) & (corners == 1)),
+        ("one_exposed_no_vertex", exposed == 1),
+    ]
+
+    return np.select(
+        [condition for _, condition in conditions],
+        [EXPOSURE_CLASSES.index(label) for label, _ in conditions],
+        default=EXPOSURE_CLASSES.index("none_exposed"),
+    )
+
+
+def visits_every_vertex(vertices, grid_size):
+    vertices = np.asarray(vertices, dtype=np.int64)
+    inside = ((vertices >= 0) & (vertices < grid_size)).all(axis=(1, 2))
+    cells = np.sort(vertices[:, :, 1] * grid_size + vertices[:, :, 0], axis=1)
+
+    return inside & (cells == np.arange(grid_size * grid_size)).all(axis=1)
+
+
+def is_canonical(moves):
+    moves = np.asarray(moves, dtype=np.uint8)
+    reverse = (moves[:, ::-1] + 2) % 4
+    differs = moves != reverse
+    first = differs.argmax(axis=1)
+    rows = np.arange(len(moves))
+
+    return ~differs.any(axis=1) | (moves[rows, first] < reverse[rows, first])
+
+
+def derived_columns(moves, vertices, grid_size):
+    vertices = np.asarray(vertices)
+    total, left, right, signed = turn_counts(moves)
+    counts = segment_histogram(moves, grid_size)
+    seg_min, seg_max, min_count, max_count = segment_summary(counts)
+
+    return {
+        "end_x": vertices[:, -1, 0],
+        "end_y": vertices[:, -1, 1],
+        "manhattan": np.abs(vertices[:, -1].astype(np.int16) - vertices[:, 0]).sum(axis=1),
+        "turns_total": total,
+        "turns_left": left,
+        "turns_right": right,
+        "turns_signed": signed,
+        "turns_longest_run": longest_turn_run(moves),
+        "turns_direction": turn_direction(signed),
+        "segments_min": seg_min,
+        "segments_max": seg_max,
+        "segments_min_count": min_count,
+        "segments_max_count": max_count,
+        "segments_counts": counts,
+        "angle": end_angle(moves),
+        "edges": edge_touches(vertices, grid_size),
+        "exposure": exposure_class(vertices, grid_size),
+    }
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+
+import json
+from pathlib import Path
+import numpy as np
+from columnar_index import build_columnar_index, columns_dir_for, load_columns
+from loop_signature import canonical_loop_signature, d4_canonical_signature
+from path_store import (
+    DIRECTION_VECTORS,
+    columns_moves,
+    moves_to_vertices,
+    pack_moves,
+    unpack_moves,
+)
+
+# Configuration
+SIZE = 4
+LOOPS_DIR_TEMPLATE = "{size}.loops"
+META_NAME = "meta.json"
+FORMAT_VERSION = 1
+
+CATALOGUE_ARRAYS = [
+    "source_ids",
+    "source_loops",
+    "loop_ids",
+    "loop_start_x",
+    "loop_start_y",
+    "loop_moves",
+    "loop_signatures",
+    "loop_d4_classes",
+    "d4_loops",
+]
+
+
+def loops_dir_for(base_dir, size):
+    return Path(base_dir) / LOOPS_DIR_TEMPLATE.format(size=size)
+
+
+def closing_moves(start_x, start_y, end_x, end_y):
+    dx = np.asarray(start_x, dtype=np.int64) - end_x
+    dy = np.asarray(start_y, dtype=np.int64) - end_y
+    moves = np.full(len(dx), -1, dtype=np.int64)
+
+    for direction, (vx, vy) in enumerate(DIRECTION_VECTORS.tolist()):
+        moves[(dx == vx) & (dy == vy)] = direction
+
+    return moves
+
+
+def signature_moves(signature, loop_len):
+    moves = [0] * loop_len
+
+    for idx in range(loop_len - 1, -1, -1):
+        moves[idx] = signature % 4
+        signature //= 4
+
+    return moves
+
+
+def build_loop_catalogue(meta, columns, output_dir):
+    output_dir = Path(output_dir)
+    rows = np.flatnonzero(np.asarray(columns["manhattan"]) == 1)
+    ids = np.asarray(columns["id"])[rows]
+    start_x = np.asarray(columns["start_x"])[rows]
+    start_y = np.asarray(columns["start_y"])[rows]
+    closing = closing_moves(start_x, start_y, columns["end_x"][rows], columns["end_y"][rows])
+    loops = np.column_stack([columns_moves(meta, columns, rows), closing]).astype(np.uint8)
+    loop_len = loops.shape[1]
+
+    loop_by_signature = {}
+    source_loops = np.zeros(len(rows), dtype=np.uint32)
+
+    for position, loop_moves in enumerate(loops.tolist()):
+        signature = canonical_loop_signature(loop_moves)
+        source_loops[position] = loop_by_signature.setdefault(signature, len(loop_by_signature))
+
+    _, representatives = np.unique(source_loops, return_index=True)
+
+    loop_ids = ids[representatives]
+    signatures = [signature_moves(signature, loop_len) for signature in loop_by_signature]
+
+    class_by_d4 = {}
+    loop_d4_classes = np.zeros(len(loop_by_signature), dtype=np.uint32)
+    d4_loops = []
+
+    for loop in np.argsort(loop_ids, kind="stable"):
+        d4_signature = d4_canonical_signature(signatures[loop])
+
+        if d4_signature not in class_by_d4:
+            class_by_d4[d4_signature] = len(class_by_d4)
+            d4_loops.append(loop)
+
+        loop_d4_classes[loop] = class_by_d4[d4_signature]
+
+    arrays = {
+        "source_ids": ids.astype(np.uint32),
+        "source_loops": source_loops,
+        "loop_ids": loop_ids.astype(np.uint32),
+        "loop_start_x": start_x[representatives].astype(np.uint8),
+        "loop_start_y": start_y[representatives].astype(np.uint8),
+        "loop_moves": pack_moves(loops[representatives]),
+        "loop_signatures": pack_moves(np.array(signatures, dtype=np.uint8).reshape(-1, loop_len)),
+        "loop_d4_classes": loop_d4_classes,
+        "d4_loops": np.asarray(d4_loops, dtype=np.uint32),
+    }
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    for name in CATALOGUE_ARRAYS:
+        np.save(output_dir / f"{name}.npy", arrays[name])
+
+    catalogue_meta = {
+        "version": FORMAT_VERSION,
+        "size": meta["size"],
+        "grid_size": meta["grid_size"],
+        "loop_length": loop_len,
+        "source_count": len(rows),
+        "loop_count": len(loop_ids),
+        "d4_count": len(d4_loops),
+    }
+
+    with open(output_dir / META_NAME, "w", encoding="utf-8") as handle:
+        json.dump(catalogue_meta, handle, indent=2)
+
+    return output_dir
+
+
+def load_loop_catalogue(loops_dir):
+    loops_dir = Path(loops_dir)
+
+    with open(loops_dir / META_NAME, "r", encoding="utf-8") as handle:
+        meta = json.load(handle)
+
+    if meta["version"] != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported loop catalogue version in {loops_dir}: "
+            f"{meta['version']} != {FORMAT_VERSION}"
+        )
+
+    catalogue = {
+        name: np.load(loops_dir / f"{name}.npy", mmap_mode="r") for name in CATALOGUE_ARRAYS
+    }
+
+    return meta, catalogue
+
+
+def catalogue_loop_moves(meta, catalogue, loops):
+    return unpack_moves(catalogue["loop_moves"][loops], meta["loop_length"])
+
+
+def catalogue_loop_points(meta, catalogue, loops):
+    loops = np.asarray(loops)
+    moves = catalogue_loop_moves(meta, catalogue, loops)
+    vertices = moves_to_vertices(
+        catalogue["loop_start_x"][loops], catalogue["loop_start_y"][loops], moves
+    )
+
+    return [[(int(x), int(y)) for x, y in loop[:-1]] for loop in vertices]
+
+
+if __name__ == "__main__":
+    base_dir = Path(__file__).parent.parent.parent / str(SIZE)
+    columns_dir = columns_dir_for(base_dir, SIZE)
+
+    if not columns_dir.exists():
+        build_columnar_index(base_dir / f"{SIZE}.json", SIZE)
+
+    meta, columns = load_columns(columns_dir)
+
+    build_loop_catalogue(meta, columns, loops_dir_for(base_dir, SIZE))
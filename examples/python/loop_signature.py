@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+from d4 import DIRECTION_TABLES
+
+D4_MOVE_TABLES = DIRECTION_TABLES.tolist()
+
+
+def least_rotation(seq):
+    size = len(seq)
+    i, j, k = 0, 1, 0
+
+    while i < size and j < size and k < size:
+        a = seq[(i + k) % size]
+        b = seq[(j + k) % size]
+
+        if a == b:
+            k += 1
+            continue
+
+        if a > b:
+            i += k + 1
+        else:
+            j += k + 1
+
+        if i == j:
+            j += 1
+
+        k = 0
+
+    return min(i, j)
+
+
+def pack_rotation(seq, start):
+    size = len(seq)
+    value = 0
+
+    for offset in range(size):
+        value = value * 4 + seq[(start + offset) % size]
+
+    return value
+
+
+def canonical_loop_signature(moves):
+    if not moves:
+        return 0
+
+    reversed_moves = [(move + 2) % 4 for move in reversed(moves)]
+
+    return min(
+        pack_rotation(moves, least_rotation(moves)),
+        pack_rotation(reversed_moves, least_rotation(reversed_moves)),
+    )
+
+
+def d4_canonical_signature(moves):
+    return min(
+        canonical_loop_signature([table[move] for move in moves])
+        for table in D4_MOVE_TABLES
+    )
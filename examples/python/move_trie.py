@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+
+import json
+import time
+from pathlib import Path
+import numpy as np
+from columnar_index import build_columnar_index, columns_dir_for, load_columns
+from path_store import unpack_moves
+
+# Configuration
+SIZE = 4
+TRIE_DIR_TEMPLATE = "{size}.trie"
+META_NAME = "meta.json"
+FORMAT_VERSION = 1
+BUILD_CHUNK = 1 << 18
+QUERY_START = (0, 0)
+QUERY_PREFIX = [0, 0, 0, 0, 0, 1]
+
+# Level-order trie over (start vertex, move string). Level 0 holds one node
+# per start vertex, level d the distinct d-move prefixes, and the last level
+# one leaf per path, so leaves are in lexicographic (start, moves) order and
+# every node covers a contiguous leaf range. Each level is stored as 2-bit
+# codes: the move into the node and the node's child count minus one.
+MOVES_PER_WORD = 32
+TRIE_ARRAYS = ["roots", "symbols", "degrees", "ids"]
+
+
+def trie_dir_for(base_dir, size):
+    return Path(base_dir) / TRIE_DIR_TEMPLATE.format(size=size)
+
+
+def pack_codes(codes):
+    codes = np.asarray(codes, dtype=np.uint8)
+    padded = np.zeros(-(-len(codes) // 4) * 4, dtype=np.uint8)
+    padded[: len(codes)] = codes
+    quads = padded.reshape(-1, 4)
+
+    return (quads[:, 0] << 6) | (quads[:, 1] << 4) | (quads[:, 2] << 2) | quads[:, 3]
+
+
+def unpack_codes(packed, count):
+    packed = np.asarray(packed, dtype=np.uint8)
+    codes = np.stack([packed >> 6, (packed >> 4) & 3, (packed >> 2) & 3, packed & 3], axis=1)
+
+    return codes.ravel()[:count]
+
+
+def move_words(moves):
+    # Left-aligned base-4 words, so comparing words compares move strings.
+    moves = np.asarray(moves, dtype=np.uint64)
+    count, path_len = moves.shape
+    words = np.zeros((count, -(-path_len // MOVES_PER_WORD)), dtype=np.uint64)
+
+    for position in range(path_len):
+        shift = np.uint64(2 * (MOVES_PER_WORD - 1 - position % MOVES_PER_WORD))
+        words[:, position // MOVES_PER_WORD] |= moves[:, position] << shift
+
+    return words
+
+
+def word_moves(words, position):
+    shift = np.uint64(2 * (MOVES_PER_WORD - 1 - position % MOVES_PER_WORD))
+
+    return ((words[:, position // MOVES_PER_WORD] >> shift) & np.uint64(3)).astype(np.uint8)
+
+
+def leading_zero_moves(values):
+    # Number of leading zero 2-bit digits in each uint64 (32 for zero).
+    values = np.asarray(values, dtype=np.uint64).copy()
+    bits = np.zeros(len(values), dtype=np.int64)
+
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = values >> np.uint64(shift)
+        moved = high != 0
+        bits[moved] += shift
+        values[moved] = high[moved]
+
+    bits += values != 0
+
+    return (64 - bits) // 2
+
+
+def common_prefixes(starts, words, path_len):
+    # Moves shared by each sorted row and the one before it; -1 marks a new
+    # start vertex (and the first row).
+    shared = np.full(len(starts), -1, dtype=np.int64)
+
+    if len(starts) < 2:
+        return shared
+
+    same_start = starts[1:] == starts[:-1]
+    differs = words[1:] != words[:-1]
+    first_word = np.argmax(differs, axis=1)
+    xor = (words[1:] ^ words[:-1])[np.arange(len(first_word)), first_word]
+    prefix = first_word * MOVES_PER_WORD + leading_zero_moves(xor)
+    shared[1:] = np.where(same_start, np.minimum(prefix, path_len), -1)
+
+    return shared
+
+
+def build_move_trie(meta, columns, output_dir):
+    output_dir = Path(output_dir)
+    grid_size = meta["grid_size"]
+    path_len = grid_size * grid_size - 1
+    count = meta["count"]
+
+    starts = np.asarray(columns["start_y"], dtype=np.int64) * grid_size + columns["start_x"]
+    words = np.concatenate(
+        [
+            move_words(unpack_moves(columns["moves"][start : start + BUILD_CHUNK], path_len))
+            for start in range(0, count, BUILD_CHUNK)
+        ]
+    )
+    keys = [words[:, column] for column in reversed(range(words.shape[1]))]
+    order = np.lexsort(keys + [starts])
+    starts = starts[order]
+    words = words[order]
+    shared = common_prefixes(starts, words, path_len)
+
+    # A row opens a level-d node when it shares fewer than d moves with the
+    # row before it.
+    level_rows = [np.nonzero(shared < level)[0] for level in range(path_len + 1)]
+    symbols = [word_moves(words[rows], level - 1) for level, rows in enumerate(level_rows) if level]
+    degrees = [
+        np.diff(np.searchsorted(level_rows[level + 1], np.append(level_rows[level], count))) - 1
+        for level in range(path_len)
+    ]
+
+    arrays = {
+        "roots": starts[level_rows[0]].astype(np.uint16),
+        "symbols": pack_codes(np.concatenate(symbols)),
+        "degrees": pack_codes(np.concatenate(degrees)),
+        "ids": np.asarray(columns["id"])[order].astype(np.uint32),
+    }
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    for name in TRIE_ARRAYS:
+        np.save(output_dir / f"{name}.npy", arrays[name])
+
+    trie_meta = {
+        "version": FORMAT_VERSION,
+        "size": meta["size"],
+        "grid_size": grid_size,
+        "path_length": path_len,
+        "count": count,
+        "level_sizes": [len(rows) for rows in level_rows],
+    }
+
+    with open(output_dir / META_NAME, "w", encoding="utf-8") as handle:
+        json.dump(trie_meta, handle, indent=2)
+
+    return output_dir
+
+
+def load_move_trie(trie_dir):
+    trie_dir = Path(trie_dir)
+
+    with open(trie_dir / META_NAME, "r", encoding="utf-8") as handle:
+        meta = json.load(handle)
+
+    if meta["version"] != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported move trie version in {trie_dir}: "
+            f"{meta['version']} != {FORMAT_VERSION}"
+        )
+
+    arrays = {name: np.load(trie_dir / f"{name}.npy") for name in TRIE_ARRAYS}
+    sizes = meta["level_sizes"]
+    bounds = np.cumsum([0] + sizes)
+    symbols = unpack_codes(arrays["symbols"], sum(sizes[1:]))
+    degrees = unpack_codes(arrays["degrees"], sum(sizes[:-1])).astype(np.int64) + 1
+
+    # children[d][i]: first level-(d + 1) child of node i, with a closing
+    # entry; leaves[d][i]: first leaf below node i, likewise.
+    children = [
+        np.concatenate([[0], np.cumsum(degrees[bounds[level] : bounds[level + 1]])])
+        for level in range(len(sizes) - 1)
+    ]
+    leaves = [np.arange(sizes[-1] + 1)]
+
+    for level in range(len(sizes) - 2, -1, -1):
+        leaves.insert(0, leaves[0][children[level]])
+
+    return {
+        "meta": meta,
+        "roots": arrays["roots"],
+        "ids": arrays["ids"],
+        "symbols": [np.zeros(sizes[0], dtype=np.uint8)]
+        + [
+            symbols[bounds[level] - sizes[0] : bounds[level + 1] - sizes[0]]
+            for level in range(1, len(sizes))
+        ],
+        "children": children,
+        "leaves": leaves,
+    }
+
+
+def start_vertex(trie, start):
+    # Starts are ordered row-major, vertex = y * n + x, so the key range
+    # ((0, 0), []) to ((0, 1), []) covers every start in row 0.
+    grid_size = trie["meta"]["grid_size"]
+    x, y = start
+
+    if not (0 <= x < grid_size and 0 <= y < grid_size):
+        raise ValueError(f"Start {start} is outside the {grid_size}x{grid_size} grid")
+
+    return y * grid_size + x
+
+
+def root_node(trie, start):
+    vertex = start_vertex(trie, start)
+    node = int(np.searchsorted(trie["roots"], vertex))
+
+    if node == len(trie["roots"]) or trie["roots"][node] != vertex:
+        return None
+
+    return node
+
+
+def child_node(trie, level, node, move):
+    low, high = int(trie["children"][level][node]), int(trie["children"][level][node + 1])
+
+    for offset, symbol in enumerate(trie["symbols"][level + 1][low:high].tolist()):
+        if symbol == move:
+            return low + offset
+
+    return None
+
+
+def prefix_node(trie, start, moves):
+    node = root_node(trie, start)
+
+    for level, move in enumerate(moves):
+        if node is None:
+            return None
+
+        node = child_node(trie, level, node, move)
+
+    return node
+
+
+def prefix_range(trie, start, moves):
+    node = prefix_node(trie, start, moves)
+
+    if node is None:
+        return 0, 0
+
+    leaves = trie["leaves"][len(moves)]
+
+    return int(leaves[node]), int(leaves[node + 1])
+
+
+def prefix_ids(trie, start, moves):
+    # In (start, moves) key order, not sorted by ID.
+    low, high = prefix_range(trie, start, moves)
+
+    return trie["ids"][low:high]
+
+
+def prefix_count(trie, start, moves):
+    low, high = prefix_range(trie, start, moves)
+
+    return high - low
+
+
+def next_moves(trie, start, moves):
+    # move -> number of paths continuing with it, for path completion.
+    node = prefix_node(trie, start, moves)
+    level = len(moves)
+
+    if node is None or level == trie["meta"]["path_length"]:
+        return {}
+
+    low, high = int(trie["children"][level][node]), int(trie["children"][level][node + 1])
+    leaves = trie["leaves"][level + 1]
+
+    return {
+        int(trie["symbols"][level + 1][child]): int(leaves[child + 1] - leaves[child])
+        for child in range(low, high)
+    }
+
+
+def expand_ranges(first, last):
+    lengths = np.asarray(last - first, dtype=np.int64)
+    bases = first - np.concatenate([[0], np.cumsum(lengths)[:-1]])
+
+    return np.repeat(bases, lengths) + np.arange(lengths.sum())
+
+
+def level_nodes(trie, level, start=None):
+    # Every subtree covers one contiguous run of nodes on each level.
+    low, high = 0, len(trie["roots"])
+
+    if start is not None:
+        node = root_node(trie, start)
+
+        if node is None:
+            return np.zeros(0, dtype=np.int64)
+
+        low, high = node, node + 1
+
+    for depth in range(level):
+        children = trie["children"][depth]
+        low, high = int(children[low]), int(children[high])
+
+    return np.arange(low, high)
+
+
+def match_pattern(trie, nodes, level, pattern):
+    for offset, move in enumerate(pattern):
+        children = trie["children"][level + offset]
+        nodes = expand_ranges(children[nodes], children[nodes + 1])
+
+        if move is not None:
+            nodes = nodes[trie["symbols"][level + offset + 1][nodes] == move]
+
+    return nodes
+
+
+def pattern_count(trie, pattern, start=None, anchored=True):
+    # pattern is a move list with None as a wildcard. Anchored patterns
+    # match from the first move (k leading Nones match at move k); otherwise
+    # every path containing the pattern at any offset is counted once.
+    path_len = trie["meta"]["path_length"]
+
+    if len(pattern) > path_len:
+        raise ValueError(f"Pattern of {len(pattern)} moves is longer than the paths ({path_len})")
+
+    if anchored:
+        nodes = match_pattern(trie, level_nodes(trie, 0, start), 0, pattern)
+        leaves = trie["leaves"][len(pattern)]
+
+        return int((leaves[nodes + 1] - leaves[nodes]).sum())
+
+    # Leaf ranges matched at different offsets overlap, so they are merged
+    # as +1/-1 edges before counting covered leaves.
+    count = trie["meta"]["count"]
+    edges = np.zeros(count + 1, dtype=np.int64)
+
+    for offset in range(path_len - len(pattern) + 1):
+        nodes = match_pattern(trie, level_nodes(trie, offset, start), offset, pattern)
+        leaves = trie["leaves"][offset + len(pattern)]
+        edges += np.bincount(leaves[nodes], minlength=count + 1)
+        edges -= np.bincount(leaves[nodes + 1], minlength=count + 1)
+
+    return int((np.cumsum(edges)[:-1] > 0).sum())
+
+
+def lower_bound(trie, start, moves):
+    # Leaf position of the first path whose (start, moves) key is >= the
+    # given key; a shorter key compares as its smallest extension.
+    vertex = start_vertex(trie, start)
+    node = int(np.searchsorted(trie["roots"], vertex))
+
+    if node == len(trie["roots"]):
+        return trie["meta"]["count"]
+
+    if trie["roots"][node] != vertex:
+        return int(trie["leaves"][0][node])
+
+    for level, move in enumerate(moves):
+        low, high = int(trie["children"][level][node]), int(trie["children"][level][node + 1])
+        symbols = trie["symbols"][level + 1][low:high]
+        offset = int(np.searchsorted(symbols, move))
+
+        if offset == len(symbols) or symbols[offset] != move:
+            return int(trie["leaves"][level + 1][low + offset])
+
+        node = low + offset
+
+    return int(trie["leaves"][len(moves)][node])
+
+
+def range_ids(trie, low_key, high_key):
+    # IDs of paths with low_key <= (start, moves) < high_key, in key order,
+    # with starts compared row-major (see start_vertex).
+    low = lower_bound(trie, *low_key)
+    high = lower_bound(trie, *high_key)
+
+    return trie["ids"][low:max(low, high)]
+
+
+def trie_moves(trie):
+    # Rebuilds (ids, start_x, start_y, moves) in leaf order from the trie
+    # alone, so it can stand in for the packed move column.
+    meta = trie["meta"]
+    path_len = meta["path_length"]
+    count = meta["count"]
+    moves = np.empty((count, path_len), dtype=np.uint8)
+    nodes = np.arange(count)
+
+    for level in range(path_len, 0, -1):
+        moves[:, level - 1] = trie["symbols"][level][nodes]
+        nodes = np.searchsorted(trie["children"][level - 1], nodes, side="right") - 1
+
+    vertices = trie["roots"][nodes].astype(np.int64)
+    grid_size = meta["grid_size"]
+
+    return trie["ids"], vertices % grid_size, vertices // grid_size, moves
+
+
+if __name__ == "__main__":
+    base_dir = Path(__file__).parent.parent.parent / str(SIZE)
+    trie_dir = trie_dir_for(base_dir, SIZE)
+
+    if not trie_dir.exists():
+        columns_dir = columns_dir_for(base_dir, SIZE)
+
+        if not columns_dir.exists():
+            build_columnar_index(base_dir / f"{SIZE}.json", SIZE)
+
+        meta, columns = load_columns(columns_dir)
+        build_move_trie(meta, columns, trie_dir)
+
+    trie = load_move_trie(trie_dir)
+
+    started = time.perf_counter()
+    count = prefix_count(trie, QUERY_START, QUERY_PREFIX)
+    completions = next_moves(trie, QUERY_START, QUERY_PREFIX)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    print(f"{count} paths from {QUERY_START} start with {QUERY_PREFIX} ({elapsed:.3f} ms)")
+    print(f"next moves: {completions}")
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+
+from array import array
+from pathlib import Path
+from columnar_index import (
+    EXPOSURE_CLASSES,
+    SYMMETRY_LABELS,
+    TRANSFORM_NAMES,
+    TURN_DIRECTIONS,
+    get_path_hex,
+    get_start_end,
+)
+from record_stream import iter_records
+
+# Configuration
+SIZE = 4
+
+# README field name -> PathRecord attribute.
+FIELD_ATTRIBUTES = {
+    "id": "id",
+    "path.hex": "path_hex",
+    "path.length": "path_length",
+    "position.start.x": "start_x",
+    "position.start.y": "start_y",
+    "position.end.x": "end_x",
+    "position.end.y": "end_y",
+    "distance.manhattan": "manhattan",
+    "geometry.segments.lengths": "segments_lengths",
+    "geometry.segments.min": "segments_min",
+    "geometry.segments.max": "segments_max",
+    "geometry.segments.counts": "segments_counts",
+    "geometry.segments.min_count": "segments_min_count",
+    "geometry.segments.max_count": "segments_max_count",
+    "geometry.angle": "angle",
+    "geometry.edges": "edges",
+    "turns.total": "turns_total",
+    "turns.left": "turns_left",
+    "turns.right": "turns_right",
+    "turns.signed": "turns_signed",
+    "turns.longest_run": "turns_longest_run",
+    "turns.direction": "turns_direction",
+    "exposure": "exposure",
+    "symmetry.transforms": "symmetry_transforms",
+    "symmetry.properties": "symmetry_properties",
+    "symmetry.label": "symmetry_label",
+    "groups.dihedral": "groups_dihedral",
+    "groups.endpoints": "groups_endpoints",
+}
+
+
+def shared_label(vocabulary, value):
+    # Reuse the vocabulary string so every record points at the same object.
+    return None if value is None else vocabulary[vocabulary.index(value)]
+
+
+class PathRecord:
+    # Fields missing from a legacy record are None. Segment lengths are kept
+    # as bytes and symmetry transforms as a uint32 array (TRANSFORM_NAMES order).
+    __slots__ = (
+        "id",
+        "path_hex",
+        "path_length",
+        "start_x",
+        "start_y",
+        "end_x",
+        "end_y",
+        "manhattan",
+        "_segments_lengths",
+        "segments_min",
+        "segments_max",
+        "segments_min_count",
+        "segments_max_count",
+        "angle",
+        "edges",
+        "turns_total",
+        "turns_left",
+        "turns_right",
+        "turns_signed",
+        "turns_longest_run",
+        "turns_direction",
+        "exposure",
+        "_symmetry_transforms",
+        "symmetry_label",
+        "groups_dihedral",
+        "groups_endpoints",
+    )
+
+    @classmethod
+    def from_dict(cls, record):
+        path_hex, path_length = get_path_hex(record)
+        start_x, start_y, end_x, end_y = get_start_end(record)
+        geometry = record.get("geometry", {})
+        segments = geometry.get("segments", {})
+        turns = record.get("turns", {})
+        symmetry = record.get("symmetry", {})
+        groups = record.get("groups", {})
+        lengths = segments.get("lengths")
+        transforms = symmetry.get("transforms")
+
+        self = cls.__new__(cls)
+        self.id = record["id"]
+        self.path_hex = path_hex
+        self.path_length = path_length
+        self.start_x = start_x
+        self.start_y = start_y
+        self.end_x = end_x
+        self.end_y = end_y
+        self.manhattan = abs(end_x - start_x) + abs(end_y - start_y)
+        self._segments_lengths = None if lengths is None else bytes(lengths)
+        self.segments_min = segments.get("min")
+        self.segments_max = segments.get("max")
+        self.segments_min_count = segments.get("min_count")
+        self.segments_max_count = segments.get("max_count")
+        self.angle = geometry.get("angle")
+        self.edges = geometry.get("edges")
+        self.turns_total = turns.get("total")
+        self.turns_left = turns.get("left")
+        self.turns_right = turns.get("right")
+        self.turns_signed = turns.get("signed")
+        self.turns_longest_run = turns.get("longest_run")
+        self.turns_direction = shared_label(TURN_DIRECTIONS, turns.get("direction"))
+        self.exposure = shared_label(EXPOSURE_CLASSES, record.get("exposure"))
+        self._symmetry_transforms = (
+            None
+            if transforms is None
+            else array("I", [transforms[name] for name in TRANSFORM_NAMES])
+        )
+        self.symmetry_label = shared_label(SYMMETRY_LABELS, symmetry.get("label"))
+        self.groups_dihedral = groups.get("dihedral")
+        self.groups_endpoints = groups.get("endpoints")
+
+        return self
+
+    @property
+    def segments_lengths(self):
+        return None if self._segments_lengths is None else list(self._segments_lengths)
+
+    @property
+    def segments_counts(self):
+        if self._segments_lengths is None:
+            return None
+
+        counts = {}
+
+        for length in self._segments_lengths:
+            counts[str(length)] = counts.get(str(length), 0) + 1
+
+        return dict(sorted(counts.items(), key=lambda item: int(item[0])))
+
+    @property
+    def symmetry_transforms(self):
+        if self._symmetry_transforms is None:
+            return None
+
+        return dict(zip(TRANSFORM_NAMES, self._symmetry_transforms))
+
+    @property
+    def symmetry_properties(self):
+        if self._symmetry_transforms is None:
+            return None
+
+        return {
+            name: record_id == self.id
+            for name, record_id in zip(TRANSFORM_NAMES, self._symmetry_transforms)
+        }
+
+    def get(self, field):
+        if field not in FIELD_ATTRIBUTES:
+            raise ValueError(f"Unknown record field {field!r}")
+
+        return getattr(self, FIELD_ATTRIBUTES[field])
+
+    def to_dict(self):
+        record = {}
+
+        for field, attribute in FIELD_ATTRIBUTES.items():
+            value = getattr(self, attribute)
+
+            if value is None:
+                continue
+
+            *parents, name = field.split(".")
+            target = record
+
+            for parent in parents:
+                target = target.setdefault(parent, {})
+
+            target[name] = value
+
+        return record
+
+    def __repr__(self):
+        return (
+            f"PathRecord(id={self.id}, start=({self.start_x}, {self.start_y}), "
+            f"end=({self.end_x}, {self.end_y}), path={self.path_hex!r})"
+        )
+
+
+def iter_path_records(json_path):
+    for record in iter_records(json_path):
+        yield PathRecord.from_dict(record)
+
+
+def load_path_records(json_path):
+    return {record.id: record for record in iter_path_records(json_path)}
+
+
+if __name__ == "__main__":
+    json_path = Path(__file__).parent.parent.parent / str(SIZE) / f"{SIZE}.json"
+    records = load_path_records(json_path)
+    loops = sum(record.manhattan == 1 for record in records.values())
+
+    print(f"{len(records)} records loaded, {loops} with manhattan=1")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+import numpy as np
+
+# A Hamiltonian path never reverses, so every move after the first is one of
+# straight/right/left relative to the previous move. Paths are packed as the
+# first move followed by base-3 turn digits, TURNS_PER_WORD digits per uint64
+# word. Sizes 0-4 fit in a single word.
+TURNS_PER_WORD = 39
+TURN_DELTAS = np.array([0, 1, 3], dtype=np.uint8)
+DELTA_TO_TURN = np.array([0, 1, 255, 2], dtype=np.uint8)
+
+DIRECTION_VECTORS = np.array([(1, 0), (0, 1), (-1, 0), (0, -1)], dtype=np.int8)
+
+HEX_DIGITS = "0123456789abcdef"
+HEX_TABLE = np.zeros(256, dtype=np.uint8)
+
+for _value, _char in enumerate(HEX_DIGITS):
+    HEX_TABLE[ord(_char)] = _value
+    HEX_TABLE[ord(_char.upper())] = _value
+
+
+def words_for_length(path_len):
+    return max(1, -(-(path_len - 1) // TURNS_PER_WORD))
+
+
+def moves_from_hex(hex_paths, path_len):
+    width = (path_len + 1) // 2
+    joined = "".join(hex_path.rjust(width, "0") for hex_path in hex_paths)
+    nibbles = HEX_TABLE[np.frombuffer(joined.encode("ascii"), dtype=np.uint8)]
+    digits = np.stack([nibbles >> 2, nibbles & 3], axis=-1)
+
+    return digits.reshape(len(hex_paths), 2 * width)[:, 2 * width - path_len :]
+
+
+def moves_to_hex(moves):
+    moves = np.asarray(moves, dtype=np.uint8)
+    count, path_len = moves.shape
+    width = (path_len + 1) // 2
+    padded = np.zeros((count, 2 * width), dtype=np.uint8)
+    padded[:, 2 * width - path_len :] = moves
+    nibbles = (padded[:, 0::2] << 2) | padded[:, 1::2]
+    chars = np.frombuffer(HEX_DIGITS.encode("ascii"), dtype=np.uint8)[nibbles]
+
+    return [row.tobytes().decode("ascii") for row in chars]
+
+
+def pack_moves(moves):
+    moves = np.asarray(moves, dtype=np.uint8)
+    count, path_len = moves.shape
+    turns = DELTA_TO_TURN[(moves[:, 1:].astype(np.int16) - moves[:, :-1]) % 4]
+
+    if np.any(turns == 255):
+        raise ValueError("Move sequence reverses direction and cannot be packed")
+
+    packed = np.zeros((count, words_for_length(path_len)), dtype=np.uint64)
+
+    for word in range(packed.shape[1]):
+        chunk = turns[:, word * TURNS_PER_WORD : (word + 1) * TURNS_PER_WORD]
+        value = moves[:, 0].astype(np.uint64) if word == 0 else packed[:, word]
+
+        for col in range(chunk.shape[1]):
+            value = value * np.uint64(3) + chunk[:, col]
+
+        packed[:, word] = value
+
+    return packed
+
+
+def unpack_moves(packed, path_len):
+    packed = np.asarray(packed, dtype=np.uint64)
+    count = packed.shape[0]
+    turns = np.zeros((count, path_len - 1), dtype=np.uint8)
+    first = np.zeros(count, dtype=np.uint8)
+
+    for word in range(packed.shape[1]):
+        start = word * TURNS_PER_WORD
+        stop = min(start + TURNS_PER_WORD, path_len - 1)
+        value = packed[:, word].copy()
+
+        for col in range(stop - 1, start - 1, -1):
+            turns[:, col] = value % np.uint64(3)
+            value //= np.uint64(3)
+
+        if word == 0:
+            first = value.astype(np.uint8)
+
+    deltas = TURN_DELTAS[turns].astype(np.uint16)
+    moves = np.empty((count, path_len), dtype=np.uint8)
+    moves[:, 0] = first
+    moves[:, 1:] = (first[:, None] + np.cumsum(deltas, axis=1)) % 4
+
+    return moves
+
+
+def moves_to_vertices(start_x, start_y, moves):
+    moves = np.asarray(moves, dtype=np.uint8)
+    count, path_len = moves.shape
+    vertices = np.empty((count, path_len + 1, 2), dtype=np.int8)
+    vertices[:, 0, 0] = start_x
+    vertices[:, 0, 1] = start_y
+    vertices[:, 1:] = vertices[:, :1] + np.cumsum(DIRECTION_VECTORS[moves], axis=1)
+
+    return vertices
+
+
+def columns_moves(meta, columns, rows=None):
+    packed = columns["moves"] if rows is None else columns["moves"][rows]
+
+    return unpack_moves(packed, meta["grid_size"] ** 2 - 1)
+
+
+def columns_vertices(meta, columns, rows=None):
+    moves = columns_moves(meta, columns, rows)
+    start_x = columns["start_x"] if rows is None else columns["start_x"][rows]
+    start_y = columns["start_y"] if rows is None else columns["start_y"][rows]
+
+    return moves_to_vertices(start_x, start_y, moves)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+import numpy as np
+
+# Filter keys follow the FILTER_SETS vocabulary of tile_filtered_paths.py and
+# are listed in classification tree order.
+FILTER_COLUMNS = {
+    "sym": "symmetry_label",
+    "turns": "turns_total",
+    "turnrun": "turns_longest_run",
+    "longrun": "segments_max",
+    "maxsegcount": "segments_max_count",
+    "minsegcount": "segments_min_count",
+    "angle": "angle",
+    "manhattan": "manhattan",
+    "signedabs": "turns_signed",
+    "edge_touch": "edges",
+    "exposure": "exposure",
+    "turn": "turns_direction",
+}
+
+POPCOUNT_TABLE = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def feature_values(columns, key):
+    values = np.asarray(columns[FILTER_COLUMNS[key]])
+
+    if key == "signedabs":
+        return np.abs(values.astype(np.int16))
+
+    return values
+
+
+def feature_values_at(columns, key, row):
+    value = int(columns[FILTER_COLUMNS[key]][row])
+
+    if key == "signedabs":
+        return abs(value)
+
+    return value
+
+
+def feature_label(meta, key, code):
+    vocabulary = meta["vocabularies"].get(FILTER_COLUMNS[key])
+
+    if vocabulary is None:
+        return int(code)
+
+    return vocabulary[code]
+
+
+def build_query_index(meta, columns):
+    bitmaps = {}
+
+    for key in FILTER_COLUMNS:
+        values = feature_values(columns, key)
+
+        bitmaps[key] = {
+            feature_label(meta, key, code): np.packbits(values == code)
+            for code in np.unique(values)
+        }
+
+    return {"count": meta["count"], "ids": np.asarray(columns["id"]), "bitmaps": bitmaps}
+
+
+def full_bitmap(count):
+    return np.packbits(np.ones(count, dtype=bool))
+
+
+def query_bitmap(index, filters):
+    result = full_bitmap(index["count"])
+
+    for key, allowed in filters.items():
+        if allowed is None:
+            continue
+
+        if key not in index["bitmaps"]:
+            raise ValueError(f"Unknown filter key: {key}")
+
+        union = np.zeros_like(result)
+
+        for value in allowed:
+            bitmap = index["bitmaps"][key].get(value)
+
+            if bitmap is not None:
+                union |= bitmap
+
+        result &= union
+
+    return result
+
+
+def query_rows(index, filters):
+    bitmap = query_bitmap(index, filters)
+
+    return np.flatnonzero(np.unpackbits(bitmap, count=index["count"]))
+
+
+def query_ids(index, filters):
+    return index["ids"][query_rows(index, filters)]
+
+
+def count_matches(index, filters):
+    return int(POPCOUNT_TABLE[query_bitmap(index, filters)].sum(dtype=np.int64))
+
+
+def facet_counts(index, key, filters):
+    # Matches per value of key among the records that pass filters.
+    if key not in index["bitmaps"]:
+        raise ValueError(f"Unknown filter key: {key}")
+
+    result = query_bitmap(index, filters)
+
+    return {
+        label: int(POPCOUNT_TABLE[result & bitmap].sum(dtype=np.int64))
+        for label, bitmap in index["bitmaps"][key].items()
+    }
+
+
+def svg_relative_path(meta, columns, row):
+    parts = [
+        f"{key}_{feature_label(meta, key, feature_values_at(columns, key, row))}"
+        for key in FILTER_COLUMNS
+    ]
+
+    parts.append(f"{meta['size']}_{int(columns['id'][row])}.svg")
+
+    return "/".join(parts)
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+import numpy as np
+from columnar_index import build_columnar_index, columns_dir_for, load_columns
+from enumerate_paths import column_records
+from path_store import columns_vertices
+from query_engine import FILTER_COLUMNS, build_query_index, facet_counts, query_rows
+from raster import SCALE, encode_png, render_thumbnails
+from svg_render import columns_svg_documents
+
+# Configuration
+SIZE = 4
+HOST = "127.0.0.1"
+PORT = 8000
+WORKERS = os.cpu_count() or 1
+TILE_CACHE_SIZE = 4096
+DEFAULT_LIMIT = 1000
+MAX_SCALE = 40
+MAX_REQUEST_BYTES = 16384
+
+# Routes (GET only; filter parameters use the FILTER_SETS vocabulary, with
+# comma-separated values, e.g. /ids?sym=none&turns=10,11):
+#   /records/{id}          the README JSON record
+#   /ids?...               matching IDs, paged with limit/offset
+#   /facets/{key}?...      match counts per value of key
+#   /tiles/{id}.svg        the path as a standalone SVG
+#   /tiles/{id}.png        raster thumbnail, scale=1..MAX_SCALE
+CONTENT_TYPES = {
+    "json": "application/json",
+    "svg": "image/svg+xml",
+    "png": "image/png",
+}
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+
+_worker_state = {}
+
+
+class RequestError(ValueError):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def init_worker(columns_dir):
+    meta, columns = load_columns(columns_dir, ["start_x", "start_y", "moves"])
+
+    _worker_state["meta"] = meta
+    _worker_state["columns"] = columns
+
+
+def render_png(task):
+    row, scale = task
+    meta = _worker_state["meta"]
+    vertices = columns_vertices(meta, _worker_state["columns"], [row])
+
+    return encode_png(render_thumbnails(vertices, meta["grid_size"], scale)[0])
+
+
+def load_service(columns_dir, workers=WORKERS, tile_cache_size=TILE_CACHE_SIZE):
+    # Everything a request needs is loaded once and shared by all handlers.
+    meta, columns = load_columns(columns_dir)
+
+    return {
+        "meta": meta,
+        "columns": columns,
+        "ids": np.asarray(columns["id"]),
+        "query_index": build_query_index(meta, columns),
+        "executor": ProcessPoolExecutor(
+            max_workers=workers, initializer=init_worker, initargs=(str(columns_dir),)
+        ),
+        "tiles": OrderedDict(),
+        "tile_cache_size": tile_cache_size,
+        "pending": {},
+    }
+
+
+def record_row(service, text):
+    try:
+        record_id = int(text)
+    except ValueError:
+        raise RequestError(400, f"Invalid record ID: {text!r}") from None
+
+    ids = service["ids"]
+    row = int(np.searchsorted(ids, record_id))
+
+    if row >= len(ids) or ids[row] != record_id:
+        raise RequestError(404, f"Record {record_id} not found")
+
+    return row
+
+
+def parse_filters(meta, params):
+    filters = {}
+
+    for key, values in params.items():
+        if key in ("limit", "offset", "scale"):
+            continue
+
+        if key not in FILTER_COLUMNS:
+            raise RequestError(400, f"Unknown filter key: {key}")
+
+        vocabulary = meta["vocabularies"].get(FILTER_COLUMNS[key])
+        allowed = {value for joined in values for value in joined.split(",") if value}
+
+        try:
+            filters[key] = allowed if vocabulary is not None else {int(v) for v in allowed}
+        except ValueError:
+            raise RequestError(400, f"Filter {key} takes integers") from None
+
+    return filters
+
+
+def int_param(params, name, default, low, high):
+    try:
+        value = int(params.get(name, [default])[-1])
+    except ValueError:
+        raise RequestError(400, f"{name} must be an integer") from None
+
+    if not low <= value <= high:
+        raise RequestError(400, f"{name} must be between {low} and {high}")
+
+    return value
+
+
+async def tile_bytes(service, row, kind, scale):
+    key = (row, kind, scale)
+    tiles = service["tiles"]
+
+    if key in tiles:
+        tiles.move_to_end(key)
+        return tiles[key]
+
+    if kind == "svg":
+        body = columns_svg_documents(service["meta"], service["columns"], [row])[0].encode()
+    else:
+        # Concurrent requests for the same tile share one render, and a
+        # client hanging up does not cancel it for the others.
+        pending = service["pending"].get(key)
+
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        pending = asyncio.get_running_loop().run_in_executor(
+            service["executor"], render_png, (row, scale)
+        )
+        service["pending"][key] = pending
+        pending.add_done_callback(lambda _: service["pending"].pop(key, None))
+        body = await asyncio.shield(pending)
+
+    tiles[key] = body
+
+    while len(tiles) > service["tile_cache_size"]:
+        tiles.popitem(last=False)
+
+    return body
+
+
+async def handle_get(service, target):
+    url = urlsplit(target)
+    parts = [unquote(part) for part in url.path.strip("/").split("/")]
+    params = parse_qs(url.query)
+    meta = service["meta"]
+
+    if len(parts) == 2 and parts[0] == "records":
+        row = record_row(service, parts[1])
+        columns = {name: column[row : row + 1] for name, column in service["columns"].items()}
+        record = next(column_records(columns, meta["grid_size"]))
+
+        return "json", json.dumps(record).encode()
+
+    if len(parts) == 1 and parts[0] == "ids":
+        rows = query_rows(service["query_index"], parse_filters(meta, params))
+        offset = int_param(params, "offset", 0, 0, len(rows))
+        limit = int_param(params, "limit", DEFAULT_LIMIT, 0, meta["count"])
+        ids = service["ids"][rows[offset : offset + limit]].tolist()
+
+        return "json", json.dumps({"count": len(rows), "offset": offset, "ids": ids}).encode()
+
+    if len(parts) == 2 and parts[0] == "facets":
+        if parts[1] not in FILTER_COLUMNS:
+            raise RequestError(404, f"Unknown facet: {parts[1]}")
+
+        counts = facet_counts(service["query_index"], parts[1], parse_filters(meta, params))
+        counts = {str(label): count for label, count in counts.items()}
+
+        return "json", json.dumps({"key": parts[1], "counts": counts}).encode()
+
+    if len(parts) == 2 and parts[0] == "tiles" and "." in parts[1]:
+        stem, kind = parts[1].rsplit(".", 1)
+
+        if kind not in ("svg", "png"):
+            raise RequestError(404, f"Unsupported tile format: {kind}")
+
+        row = record_row(service, stem)
+        scale = int_param(params, "scale", SCALE, 1, MAX_SCALE) if kind == "png" else 0
+
+        return kind, await tile_bytes(service, row, kind, scale)
+
+    raise RequestError(404, f"No route for {url.path}")
+
+
+def response_bytes(status, kind, body, keep_alive):
+    headers = [
+        f"HTTP/1.1 {status} {STATUS_TEXT[status]}",
+        f"Content-Type: {CONTENT_TYPES[kind]}",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+
+    return ("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + body
+
+
+async def handle_connection(service, reader, writer):
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                break
+
+            lines = head.decode("latin-1").split("\r\n")
+            request = lines[0].split()
+            headers = {
+                name.strip().lower(): value.strip()
+                for name, _, value in (line.partition(":") for line in lines[1:] if line)
+            }
+            keep_alive = headers.get("connection", "").lower() != "close"
+
+            if len(request) != 3 or not request[2].startswith("HTTP/1."):
+                break
+
+            if request[2] == "HTTP/1.0":
+                keep_alive = headers.get("connection", "").lower() == "keep-alive"
+
+            try:
+                if request[0] != "GET":
+                    # The request body is never read, so the connection cannot
+                    # be reused for a next request.
+                    keep_alive = False
+                    raise RequestError(405, f"Method {request[0]} not allowed")
+
+                kind, body = await handle_get(service, request[1])
+                status = 200
+            except RequestError as error:
+                status, kind = error.status, "json"
+                body = json.dumps({"error": str(error)}).encode()
+            except ValueError as error:
+                status, kind = 400, "json"
+                body = json.dumps({"error": str(error)}).encode()
+            except Exception as error:
+                # E.g. a broken render pool: answer this request and keep
+                # serving the connection.
+                status, kind = 500, "json"
+                body = json.dumps({"error": f"{type(error).__name__}: {error}"}).encode()
+
+            writer.write(response_bytes(status, kind, body, keep_alive))
+            await writer.drain()
+
+            if not keep_alive:
+                break
+    finally:
+        writer.close()
+
+
+async def serve(columns_dir, host=HOST, port=PORT, workers=WORKERS, ready=None):
+    service = load_service(columns_dir, workers)
+
+    try:
+        server = await asyncio.start_server(
+            lambda reader, writer: handle_connection(service, reader, writer),
+            host,
+            port,
+            limit=MAX_REQUEST_BYTES,
+        )
+
+        async with server:
+            if ready is not None:
+                ready(server)
+
+            await server.serve_forever()
+    finally:
+        service["executor"].shutdown(cancel_futures=True)
+
+
+if __name__ == "__main__":
+    base_dir = Path(__file__).parent.parent.parent / str(SIZE)
+    columns_dir = columns_dir_for(base_dir, SIZE)
+
+    if not columns_dir.exists():
+        build_columnar_index(base_dir / f"{SIZE}.json", SIZE)
+
+    print(f"Serving {base_dir} on http://{HOST}:{PORT}")
+    asyncio.run(serve(columns_dir))
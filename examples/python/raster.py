@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import struct
+import zlib
+import numpy as np
+
+# Configuration
+SCALE = 10
+GAP = 1
+MARGIN = 1
+
+STROKE_COLOR = "#2c3e50"
+TILE_BG_COLOR = "#f8f8f8"
+CANVAS_BG_COLOR = "#ffffff"
+
+# With stroke-width 1, square caps and miter joins, a stored path covers
+# whole unit cells of its (2n - 1) x (2n - 1) viewBox: the cell at
+# (2x, 2y) for every vertex and the cell between every pair of consecutive
+# vertices. Rendering at an integer scale is therefore exact.
+CANVAS, TILE, STROKE = 0, 1, 2
+
+
+def hex_to_rgb(color):
+    color = color.lstrip("#")
+
+    return tuple(int(color[idx : idx + 2], 16) for idx in (0, 2, 4))
+
+
+def tile_extent(grid_size):
+    return 2 * grid_size - 1
+
+
+def stroke_masks(vertices, grid_size):
+    vertices = np.asarray(vertices, dtype=np.int64)
+    count = vertices.shape[0]
+    extent = tile_extent(grid_size)
+    masks = np.zeros((count, extent, extent), dtype=bool)
+    tiles = np.arange(count)[:, None]
+
+    masks[tiles, 2 * vertices[:, :, 1], 2 * vertices[:, :, 0]] = True
+
+    between = vertices[:, :-1] + vertices[:, 1:]
+    masks[tiles, between[:, :, 1], between[:, :, 0]] = True
+
+    return masks
+
+
+def render_thumbnails(vertices, grid_size, scale=SCALE):
+    masks = stroke_masks(vertices, grid_size)
+    indices = np.where(masks, STROKE, TILE).astype(np.uint8)
+
+    return indices.repeat(scale, axis=1).repeat(scale, axis=2)
+
+
+def render_sheet(vertices, grid_size, columns, rows=None, scale=SCALE):
+    masks = stroke_masks(vertices, grid_size)
+    rows = rows or -(-len(masks) // columns)
+    extent = tile_extent(grid_size)
+    step = extent + GAP
+    width = MARGIN * 2 + extent * columns + GAP * (columns - 1)
+    height = MARGIN * 2 + extent * rows + GAP * (rows - 1)
+    canvas = np.full((height, width), CANVAS, dtype=np.uint8)
+
+    for idx, mask in enumerate(masks[: columns * rows]):
+        x = MARGIN + (idx % columns) * step
+        y = MARGIN + (idx // columns) * step
+        canvas[y : y + extent, x : x + extent] = np.where(mask, STROKE, TILE)
+
+    return canvas.repeat(scale, axis=0).repeat(scale, axis=1)
+
+
+def palette_rgb():
+    return np.array(
+        [hex_to_rgb(CANVAS_BG_COLOR), hex_to_rgb(TILE_BG_COLOR), hex_to_rgb(STROKE_COLOR)],
+        dtype=np.uint8,
+    )
+
+
+def png_chunk(kind, data):
+    chunk = kind + data
+
+    return struct.pack(">I", len(data)) + chunk + struct.pack(">I", zlib.crc32(chunk))
+
+
+def encode_png(indices, palette=None):
+    palette = palette_rgb() if palette is None else palette
+    height, width = indices.shape
+    header = struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0)
+    scanlines = np.zeros((height, width + 1), dtype=np.uint8)
+    scanlines[:, 1:] = indices
+
+    return b"".join(
+        [
+            b"\x89PNG\r\n\x1a\n",
+            png_chunk(b"IHDR", header),
+            png_chunk(b"PLTE", palette.tobytes()),
+            png_chunk(b"IDAT", zlib.compress(scanlines.tobytes(), 6)),
+            png_chunk(b"IEND", b""),
+        ]
+    )
+
+
+def write_png(output_path, indices, palette=None):
+    with open(output_path, "wb") as handle:
+        handle.write(encode_png(indices, palette))
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+
+import json
+from pathlib import Path
+
+# Configuration
+SIZE = 4
+READ_CHUNK = 1 << 20
+BATCH_SIZE = 10000
+
+WHITESPACE = " \t\r\n"
+NUMBER_CHARS = "0123456789+-.eE"
+
+
+def project(record, fields):
+    if fields is None:
+        return record
+
+    projected = {}
+
+    for field in fields:
+        parts = field.split(".")
+        value = record
+
+        for part in parts:
+            if not isinstance(value, dict) or part not in value:
+                break
+
+            value = value[part]
+        else:
+            target = projected
+
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+
+            target[parts[-1]] = value
+
+    return projected
+
+
+def iter_records(json_path, fields=None, chunk_size=READ_CHUNK):
+    # Decodes one array element at a time with raw_decode, so memory stays
+    # bounded by the read chunk plus the largest single record. "expect" is
+    # the token the array grammar allows next: the opening "[", a value (or
+    # "]" right after "["), the "," or "]" after a value, then only
+    # whitespace once the array is closed.
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    expect = "["
+
+    with open(json_path, "r", encoding="utf-8") as handle:
+        while True:
+            while position < len(buffer) and buffer[position] in WHITESPACE:
+                position += 1
+
+            if position == len(buffer):
+                chunk = handle.read(chunk_size)
+
+                if not chunk:
+                    if expect == "end":
+                        return
+
+                    raise ValueError(f"{json_path} ended before the closing ']'")
+
+                buffer = chunk
+                position = 0
+                continue
+
+            char = buffer[position]
+
+            if expect == "end":
+                raise ValueError(f"{json_path} has data after the closing ']'")
+
+            if expect == "[":
+                if char != "[":
+                    raise ValueError(f"{json_path} does not contain a JSON array")
+
+                expect = "first"
+                position += 1
+                continue
+
+            if expect == "separator":
+                if char not in ",]":
+                    raise ValueError(f"{json_path} is missing a ',' between records")
+
+                expect = "value" if char == "," else "end"
+                position += 1
+                continue
+
+            if char == "]" and expect == "first":
+                expect = "end"
+                position += 1
+                continue
+
+            if char in ",]":
+                raise ValueError(f"{json_path} has an unexpected {char!r} in the array")
+
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+                failure = None
+            except json.JSONDecodeError as error:
+                end, failure = len(buffer), error
+
+            # A value that fails to decode is retried with more input, and so
+            # is a number whose rest of the buffer could still continue it
+            # ("12" of "12345", "1.5" of "1.5e10"). The read doubles the
+            # pending text each time, so a record spanning many chunks is
+            # decoded a logarithmic number of times.
+            if failure is not None or (
+                isinstance(record, (int, float)) and not buffer[end:].strip(NUMBER_CHARS)
+            ):
+                chunk = handle.read(max(chunk_size, len(buffer) - position))
+
+                if chunk:
+                    buffer = buffer[position:] + chunk
+                    position = 0
+                    continue
+
+                if failure is not None:
+                    raise failure
+
+            position = end
+            expect = "separator"
+            yield project(record, fields)
+
+            if position >= chunk_size:
+                buffer = buffer[position:]
+                position = 0
+
+
+def iter_batches(json_path, fields=None, chunk_size=READ_CHUNK, batch_size=BATCH_SIZE):
+    batch = []
+
+    for record in iter_records(json_path, fields, chunk_size):
+        batch.append(record)
+
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+if __name__ == "__main__":
+    # Imported here: columnar_index reads its input through iter_batches.
+    from columnar_index import get_manhattan
+
+    json_path = Path(__file__).parent.parent.parent / str(SIZE) / f"{SIZE}.json"
+    counts = {}
+
+    for record in iter_records(json_path, fields=["distance.manhattan", "manhattan"]):
+        manhattan = get_manhattan(record)
+        counts[manhattan] = counts.get(manhattan, 0) + 1
+
+    for manhattan, count in sorted(counts.items()):
+        print(f"manhattan={manhattan}: {count}")
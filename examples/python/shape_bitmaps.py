@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+
+import numpy as np
+from d4 import D4_MAPS
+from query_engine import POPCOUNT_TABLE
+
+BITMAP_SIZE = 5
+EPS = 1e-9
+HISTOGRAM_CHUNK = 256
+
+# Same order as d4_transforms in tile_closed_loops.py.
+ORIENTATION_NAMES = [
+    "identity",
+    "rot_90",
+    "rot_180",
+    "rot_270",
+    "mirror_v",
+    "mirror_h",
+    "mirror_d",
+    "mirror_a",
+]
+
+
+def oriented_polygons(polygons, grid_size):
+    polygons = np.asarray(polygons, dtype=np.float64)
+    x = polygons[..., 0]
+    y = polygons[..., 1]
+    m = grid_size - 1
+    oriented = []
+
+    for name in ORIENTATION_NAMES:
+        (a, b, c, d), (ox, oy) = D4_MAPS[name]
+        oriented.append(np.stack([a * x + b * y + ox * m, c * x + d * y + oy * m], axis=-1))
+
+    return np.stack(oriented, axis=-3)
+
+
+def sample_points(polygons, bitmap_size):
+    low = polygons.min(axis=-2)
+    high = polygons.max(axis=-2)
+    scale = (high - low) / bitmap_size
+    offsets = np.arange(bitmap_size) + 0.5
+
+    px = low[..., 0, None] + offsets * scale[..., 0, None]
+    py = low[..., 1, None] + offsets * scale[..., 1, None]
+    degenerate = np.any(high - low <= 0, axis=-1)
+
+    return px, py, degenerate
+
+
+def polygon_bitmaps(polygons, bitmap_size=BITMAP_SIZE):
+    polygons = np.asarray(polygons, dtype=np.float64)
+    px, py, degenerate = sample_points(polygons, bitmap_size)
+
+    x1 = polygons[..., None, None, :, 0]
+    y1 = polygons[..., None, None, :, 1]
+    x2 = np.roll(polygons, -1, axis=-2)[..., None, None, :, 0]
+    y2 = np.roll(polygons, -1, axis=-2)[..., None, None, :, 1]
+    sx = px[..., None, :, None]
+    sy = py[..., :, None, None]
+
+    within = (
+        (np.minimum(x1, x2) - EPS <= sx)
+        & (sx <= np.maximum(x1, x2) + EPS)
+        & (np.minimum(y1, y2) - EPS <= sy)
+        & (sy <= np.maximum(y1, y2) + EPS)
+    )
+    cross = (sx - x1) * (y2 - y1) - (sy - y1) * (x2 - x1)
+    on_edge = np.any(within & (np.abs(cross) <= EPS), axis=-1)
+
+    spans = (y1 > sy) != (y2 > sy)
+    safe_dy = np.where(spans, y2 - y1, 1.0)
+    x_at_y = (x2 - x1) * (sy - y1) / safe_dy + x1
+    parity = np.count_nonzero(spans & (sx < x_at_y), axis=-1) % 2 == 1
+
+    return (on_edge | parity) & ~degenerate[..., None, None]
+
+
+def pack_bitmaps(bitmaps):
+    bitmaps = np.asarray(bitmaps, dtype=bool)
+    cells = bitmaps.shape[-1] * bitmaps.shape[-2]
+
+    if cells > 64:
+        raise ValueError(f"Bitmap with {cells} cells does not fit in a uint64")
+
+    flat = bitmaps.reshape(bitmaps.shape[:-2] + (cells,)).astype(np.uint64)
+    weights = np.left_shift(np.uint64(1), np.arange(cells, dtype=np.uint64))
+
+    return (flat * weights).sum(axis=-1, dtype=np.uint64)
+
+
+def unpack_bitmap(value, bitmap_size=BITMAP_SIZE):
+    value = int(value)
+
+    return [
+        [bool(value >> (row * bitmap_size + col) & 1) for col in range(bitmap_size)]
+        for row in range(bitmap_size)
+    ]
+
+
+def loop_bitmaps(loops, grid_size, bitmap_size=BITMAP_SIZE):
+    return pack_bitmaps(polygon_bitmaps(oriented_polygons(loops, grid_size), bitmap_size))
+
+
+def popcount(values):
+    values = np.ascontiguousarray(values, dtype=np.uint64)
+
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values).astype(np.int64)
+
+    counts = POPCOUNT_TABLE[values.view(np.uint8)]
+
+    return counts.reshape(values.shape + (8,)).sum(axis=-1, dtype=np.int64)
+
+
+def bitmap_matches(bitmaps, others, bitmap_size=BITMAP_SIZE):
+    bitmaps = np.asarray(bitmaps, dtype=np.uint64)
+    others = np.asarray(others, dtype=np.uint64)
+
+    return bitmap_size * bitmap_size - popcount(bitmaps[..., None] ^ others)
+
+
+def match_histograms(matches, bitmap_size=BITMAP_SIZE):
+    matches = np.asarray(matches, dtype=np.int64)
+    bins = bitmap_size * bitmap_size + 1
+    rows = matches.reshape(-1, matches.shape[-1])
+    offsets = np.arange(len(rows), dtype=np.int64)[:, None] * bins
+    counts = np.bincount((rows + offsets).ravel(), minlength=len(rows) * bins)
+
+    return counts.reshape(matches.shape[:-1] + (bins,))
+
+
+def profile_histograms(base_bitmaps, current_bitmaps, bitmap_size=BITMAP_SIZE):
+    base_bitmaps = np.asarray(base_bitmaps, dtype=np.uint64)
+    current_bitmaps = np.asarray(current_bitmaps, dtype=np.uint64)
+    bins = bitmap_size * bitmap_size + 1
+    histograms = np.zeros(base_bitmaps.shape + (bins,), dtype=np.int64)
+
+    for start in range(0, len(base_bitmaps), HISTOGRAM_CHUNK):
+        chunk = base_bitmaps[start : start + HISTOGRAM_CHUNK]
+        matches = bitmap_matches(chunk, current_bitmaps, bitmap_size)
+        histograms[start : start + HISTOGRAM_CHUNK] = match_histograms(matches, bitmap_size)
+
+    loops = np.arange(len(base_bitmaps))
+    orientations = np.arange(base_bitmaps.shape[1])
+    self_matches = bitmap_size * bitmap_size - popcount(base_bitmaps ^ current_bitmaps[:, None])
+    histograms[loops[:, None], orientations, self_matches] -= 1
+
+    return histograms
+
+
+def update_profile_histograms(
+    histograms, base_bitmaps, index, old_bitmap, new_bitmap, bitmap_size=BITMAP_SIZE
+):
+    base_bitmaps = np.asarray(base_bitmaps, dtype=np.uint64)
+    others = np.flatnonzero(np.arange(len(base_bitmaps)) != index)
+    orientations = np.arange(base_bitmaps.shape[1])
+    old_matches = bitmap_matches(base_bitmaps[others], [old_bitmap], bitmap_size)[..., 0]
+    new_matches = bitmap_matches(base_bitmaps[others], [new_bitmap], bitmap_size)[..., 0]
+
+    histograms[others[:, None], orientations, old_matches] -= 1
+    histograms[others[:, None], orientations, new_matches] += 1
+
+    return others[(old_matches != new_matches).any(axis=1)]
+
+
+def best_orientation(histograms):
+    return int(np.lexsort(np.asarray(histograms).T)[0])
+
+
+def profile_order(bitmaps, bitmap_size=BITMAP_SIZE):
+    bitmaps = np.asarray(bitmaps, dtype=np.uint64)
+    histograms = profile_histograms(bitmaps[:, None], bitmaps, bitmap_size)[:, 0]
+
+    return np.lexsort(-histograms.T)
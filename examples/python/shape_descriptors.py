@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+
+import json
+from pathlib import Path
+import numpy as np
+from columnar_index import build_columnar_index, columns_dir_for, load_columns
+from loop_catalogue import (
+    build_loop_catalogue,
+    catalogue_loop_points,
+    load_loop_catalogue,
+    loops_dir_for,
+)
+from query_engine import POPCOUNT_TABLE
+from shape_bitmaps import polygon_bitmaps
+
+# Configuration
+SIZE = 4
+BITMAP_SIZE = 16
+TURNING_SAMPLES = 64
+DESCRIPTORS_DIR_TEMPLATE = "{size}.descriptors"
+PARAMS_DIR_TEMPLATE = "bitmap{bitmap_size}_turning{turning_samples}"
+META_NAME = "meta.json"
+FORMAT_VERSION = 1
+
+DESCRIPTOR_CHUNK = 128
+DISTANCE_CHUNK = 64
+
+DESCRIPTOR_NAMES = ["bitmaps", "area", "perimeter", "hu_moments", "turning"]
+
+
+def descriptors_dir_for(base_dir, size, bitmap_size=BITMAP_SIZE, turning_samples=TURNING_SAMPLES):
+    params = PARAMS_DIR_TEMPLATE.format(
+        bitmap_size=bitmap_size, turning_samples=turning_samples
+    )
+
+    return Path(base_dir) / DESCRIPTORS_DIR_TEMPLATE.format(size=size) / params
+
+
+def polygon_edges(polygons):
+    polygons = np.asarray(polygons, dtype=np.float64)
+    x1, y1 = polygons[..., 0], polygons[..., 1]
+    x2, y2 = np.roll(x1, -1, axis=-1), np.roll(y1, -1, axis=-1)
+
+    return x1, y1, x2, y2
+
+
+def polygon_area(polygons):
+    x1, y1, x2, y2 = polygon_edges(polygons)
+
+    return np.abs((x1 * y2 - x2 * y1).sum(axis=-1)) / 2
+
+
+def polygon_perimeter(polygons):
+    x1, y1, x2, y2 = polygon_edges(polygons)
+
+    return np.hypot(x2 - x1, y2 - y1).sum(axis=-1)
+
+
+def raw_moments(polygons):
+    # Green's theorem over the polygon edges; the orientation sign is
+    # folded in so clockwise and counter-clockwise loops agree.
+    x1, y1, x2, y2 = polygon_edges(polygons)
+    cross = x1 * y2 - x2 * y1
+    sign = np.sign(cross.sum(axis=-1, keepdims=True))
+    cross = cross * np.where(sign == 0, 1, sign)
+
+    def total(terms, divisor):
+        return (terms * cross).sum(axis=-1) / divisor
+
+    return {
+        (0, 0): total(1, 2),
+        (1, 0): total(x1 + x2, 6),
+        (0, 1): total(y1 + y2, 6),
+        (2, 0): total(x1 * x1 + x1 * x2 + x2 * x2, 12),
+        (0, 2): total(y1 * y1 + y1 * y2 + y2 * y2, 12),
+        (1, 1): total(x1 * y2 + 2 * x1 * y1 + 2 * x2 * y2 + x2 * y1, 24),
+        (3, 0): total((x1 + x2) * (x1 * x1 + x2 * x2), 20),
+        (0, 3): total((y1 + y2) * (y1 * y1 + y2 * y2), 20),
+        (2, 1): total(
+            x1 * x1 * (3 * y1 + y2) + 2 * x1 * x2 * (y1 + y2) + x2 * x2 * (y1 + 3 * y2), 60
+        ),
+        (1, 2): total(
+            y1 * y1 * (3 * x1 + x2) + 2 * y1 * y2 * (x1 + x2) + y2 * y2 * (x1 + 3 * x2), 60
+        ),
+    }
+
+
+def hu_moments(polygons):
+    m = raw_moments(polygons)
+    area = m[(0, 0)]
+    safe_area = np.where(area == 0, 1, area)
+    cx = m[(1, 0)] / safe_area
+    cy = m[(0, 1)] / safe_area
+
+    mu = {
+        (2, 0): m[(2, 0)] - cx * m[(1, 0)],
+        (0, 2): m[(0, 2)] - cy * m[(0, 1)],
+        (1, 1): m[(1, 1)] - cx * m[(0, 1)],
+        (3, 0): m[(3, 0)] - 3 * cx * m[(2, 0)] + 2 * cx * cx * m[(1, 0)],
+        (0, 3): m[(0, 3)] - 3 * cy * m[(0, 2)] + 2 * cy * cy * m[(0, 1)],
+        (2, 1): m[(2, 1)] - 2 * cx * m[(1, 1)] - cy * m[(2, 0)] + 2 * cx * cx * m[(0, 1)],
+        (1, 2): m[(1, 2)] - 2 * cy * m[(1, 1)] - cx * m[(0, 2)] + 2 * cy * cy * m[(1, 0)],
+    }
+    eta = {key: value / safe_area ** (1 + sum(key) / 2) for key, value in mu.items()}
+
+    n20, n02, n11 = eta[(2, 0)], eta[(0, 2)], eta[(1, 1)]
+    n30, n03, n21, n12 = eta[(3, 0)], eta[(0, 3)], eta[(2, 1)], eta[(1, 2)]
+    a, b = n30 + n12, n21 + n03
+
+    hu = np.stack(
+        [
+            n20 + n02,
+            (n20 - n02) ** 2 + 4 * n11 ** 2,
+            (n30 - 3 * n12) ** 2 + (3 * n21 - n03) ** 2,
+            a ** 2 + b ** 2,
+            (n30 - 3 * n12) * a * (a ** 2 - 3 * b ** 2)
+            + (3 * n21 - n03) * b * (3 * a ** 2 - b ** 2),
+            (n20 - n02) * (a ** 2 - b ** 2) + 4 * n11 * a * b,
+            (3 * n21 - n03) * a * (a ** 2 - 3 * b ** 2)
+            - (n30 - 3 * n12) * b * (3 * a ** 2 - b ** 2),
+        ],
+        axis=-1,
+    )
+
+    return np.where((area == 0)[..., None], 0, hu)
+
+
+def turning_signature(polygons, samples=TURNING_SAMPLES):
+    x1, y1, x2, y2 = polygon_edges(polygons)
+    angles = np.arctan2(y2 - y1, x2 - x1)
+    turns = (np.diff(angles, axis=-1) + np.pi) % (2 * np.pi) - np.pi
+    cumulative = np.concatenate(
+        [np.zeros(turns.shape[:-1] + (1,)), np.cumsum(turns, axis=-1)], axis=-1
+    )
+
+    lengths = np.hypot(x2 - x1, y2 - y1)
+    starts = np.cumsum(lengths, axis=-1) - lengths
+    perimeter = lengths.sum(axis=-1, keepdims=True)
+    positions = (np.arange(samples) + 0.5) / samples * np.where(perimeter == 0, 1, perimeter)
+
+    edges = (starts[..., None, :] <= positions[..., :, None]).sum(axis=-1) - 1
+
+    return np.take_along_axis(cumulative, np.clip(edges, 0, None), axis=-1)
+
+
+def packed_bitmaps(polygons, bitmap_size=BITMAP_SIZE):
+    polygons = np.asarray(polygons, dtype=np.float64)
+    chunks = [
+        polygon_bitmaps(polygons[start : start + DESCRIPTOR_CHUNK], bitmap_size)
+        for start in range(0, len(polygons), DESCRIPTOR_CHUNK)
+    ]
+    bitmaps = (
+        np.concatenate(chunks)
+        if chunks
+        else np.zeros((0, bitmap_size, bitmap_size), dtype=bool)
+    )
+
+    return np.packbits(bitmaps.reshape(len(bitmaps), -1), axis=1)
+
+
+def compute_descriptors(polygons, bitmap_size=BITMAP_SIZE, turning_samples=TURNING_SAMPLES):
+    polygons = np.asarray(polygons, dtype=np.float64)
+
+    return {
+        "bitmaps": packed_bitmaps(polygons, bitmap_size),
+        "area": polygon_area(polygons),
+        "perimeter": polygon_perimeter(polygons),
+        "hu_moments": hu_moments(polygons),
+        "turning": turning_signature(polygons, turning_samples),
+    }
+
+
+def hamming_distances(left, right):
+    left = np.asarray(left, dtype=np.uint8)
+    right = np.asarray(right, dtype=np.uint8)
+
+    return POPCOUNT_TABLE[left[:, None, :] ^ right[None, :, :]].sum(axis=-1, dtype=np.int64)
+
+
+def jaccard_distances(left, right):
+    left = np.asarray(left, dtype=np.uint8)
+    right = np.asarray(right, dtype=np.uint8)
+    both = POPCOUNT_TABLE[left[:, None, :] & right[None, :, :]].sum(axis=-1, dtype=np.int64)
+    either = POPCOUNT_TABLE[left[:, None, :] | right[None, :, :]].sum(axis=-1, dtype=np.int64)
+
+    return 1 - both / np.where(either == 0, 1, either)
+
+
+def euclidean_distances(left, right):
+    left = np.asarray(left, dtype=np.float64).reshape(len(left), -1)
+    right = np.asarray(right, dtype=np.float64).reshape(len(right), -1)
+    squared = (
+        (left * left).sum(axis=1)[:, None]
+        + (right * right).sum(axis=1)[None, :]
+        - 2 * left @ right.T
+    )
+
+    return np.sqrt(np.maximum(squared, 0))
+
+
+def cityblock_distances(left, right):
+    left = np.asarray(left, dtype=np.float64).reshape(len(left), -1)
+    right = np.asarray(right, dtype=np.float64).reshape(len(right), -1)
+
+    return np.abs(left[:, None, :] - right[None, :, :]).sum(axis=-1)
+
+
+# Metric name -> (descriptor it reads, distance function over two row blocks).
+# Add an entry here to make a new metric available to pairwise_distances.
+METRICS = {
+    "hamming": ("bitmaps", hamming_distances),
+    "jaccard": ("bitmaps", jaccard_distances),
+    "hu": ("hu_moments", euclidean_distances),
+    "turning": ("turning", cityblock_distances),
+    "area": ("area", cityblock_distances),
+    "perimeter": ("perimeter", cityblock_distances),
+}
+
+
+def pairwise_distances(descriptors, metric="hamming", rows=None, chunk=DISTANCE_CHUNK):
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric!r}, expected one of {sorted(METRICS)}")
+
+    name, distance = METRICS[metric]
+    values = np.asarray(descriptors[name])
+
+    if values.ndim == 1:
+        values = values[:, None]
+
+    left = values if rows is None else values[np.asarray(rows)]
+    result = np.zeros((len(left), len(values)), dtype=np.float64)
+
+    for start in range(0, len(left), chunk):
+        result[start : start + chunk] = distance(left[start : start + chunk], values)
+
+    return result
+
+
+def save_descriptors(descriptors, output_dir, params):
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    for name in DESCRIPTOR_NAMES:
+        np.save(output_dir / f"{name}.npy", descriptors[name])
+
+    descriptor_meta = dict(params, version=FORMAT_VERSION, count=len(descriptors["area"]))
+
+    with open(output_dir / META_NAME, "w", encoding="utf-8") as handle:
+        json.dump(descriptor_meta, handle, indent=2)
+
+    return output_dir
+
+
+def load_descriptors(descriptors_dir, params=None):
+    descriptors_dir = Path(descriptors_dir)
+
+    with open(descriptors_dir / META_NAME, "r", encoding="utf-8") as handle:
+        meta = json.load(handle)
+
+    if meta["version"] != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported descriptor cache version in {descriptors_dir}: "
+            f"{meta['version']} != {FORMAT_VERSION}"
+        )
+
+    if params is not None and any(meta.get(key) != value for key, value in params.items()):
+        raise ValueError(f"Descriptor cache in {descriptors_dir} was built with other parameters")
+
+    descriptors = {
+        name: np.load(descriptors_dir / f"{name}.npy", mmap_mode="r") for name in DESCRIPTOR_NAMES
+    }
+
+    return meta, descriptors
+
+
+def loop_descriptors(base_dir, size, bitmap_size=BITMAP_SIZE, turning_samples=TURNING_SAMPLES):
+    params = {
+        "size": size,
+        "bitmap_size": bitmap_size,
+        "turning_samples": turning_samples,
+    }
+    descriptors_dir = descriptors_dir_for(base_dir, size, bitmap_size, turning_samples)
+
+    if (descriptors_dir / META_NAME).exists():
+        return load_descriptors(descriptors_dir, params)
+
+    loops_dir = loops_dir_for(base_dir, size)
+
+    if not loops_dir.exists():
+        columns_dir = columns_dir_for(base_dir, size)
+
+        if not columns_dir.exists():
+            build_columnar_index(Path(base_dir) / f"{size}.json", size)
+
+        meta, columns = load_columns(columns_dir)
+        build_loop_catalogue(meta, columns, loops_dir)
+
+    catalogue_meta, catalogue = load_loop_catalogue(loops_dir)
+    loops = np.arange(catalogue_meta["loop_count"])
+    polygons = np.array(catalogue_loop_points(catalogue_meta, catalogue, loops), dtype=np.float64)
+    descriptors = compute_descriptors(
+        polygons.reshape(len(loops), -1, 2), bitmap_size, turning_samples
+    )
+
+    save_descriptors(descriptors, descriptors_dir, params)
+
+    return load_descriptors(descriptors_dir)
+
+
+if __name__ == "__main__":
+    base_dir = Path(__file__).parent.parent.parent / str(SIZE)
+    meta, descriptors = loop_descriptors(base_dir, SIZE)
+
+    for metric in METRICS:
+        distances = pairwise_distances(descriptors, metric)
+        print(f"{metric}: {distances.shape[0]} loops, mean distance {distances.mean():.4f}")
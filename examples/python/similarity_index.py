@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+
+import json
+import time
+from pathlib import Path
+import numpy as np
+from columnar_index import build_columnar_index, columns_dir_for, load_columns
+from path_store import columns_vertices
+from shape_bitmaps import popcount
+
+# Configuration
+SIZE = 4
+SIMILARITY_DIR_TEMPLATE = "{size}.similarity"
+META_NAME = "meta.json"
+FORMAT_VERSION = 1
+
+# Bit-sampling LSH: each table hashes a path by BITS_PER_TABLE randomly chosen
+# grid edges, so paths sharing many edges collide in at least one table.
+TABLES = 16
+BITS_PER_TABLE = 16
+SEED = 0
+BUILD_CHUNK = 65536
+DEFAULT_K = 10
+QUERY_ID = None
+
+INDEX_ARRAYS = ["ids", "edges", "positions", "keys", "rows"]
+
+
+def similarity_dir_for(base_dir, size):
+    return Path(base_dir) / SIMILARITY_DIR_TEMPLATE.format(size=size)
+
+
+def edge_count(grid_size):
+    return 2 * grid_size * (grid_size - 1)
+
+
+def edge_words(grid_size):
+    return (edge_count(grid_size) + 63) // 64
+
+
+def edge_indices(vertices, grid_size):
+    # Horizontal edges are numbered row by row first, then vertical edges
+    # column by column.
+    vertices = np.asarray(vertices, dtype=np.int64)
+    first, second = vertices[:, :-1], vertices[:, 1:]
+    low_x = np.minimum(first[..., 0], second[..., 0])
+    low_y = np.minimum(first[..., 1], second[..., 1])
+    horizontal = first[..., 1] == second[..., 1]
+    span = grid_size - 1
+
+    return np.where(
+        horizontal,
+        low_y * span + low_x,
+        grid_size * span + low_x * span + low_y,
+    )
+
+
+def edge_bitmaps(vertices, grid_size):
+    indices = edge_indices(vertices, grid_size)
+    bits = np.left_shift(np.uint64(1), (indices % 64).astype(np.uint64))
+    words = indices // 64
+    bitmaps = np.zeros((len(indices), edge_words(grid_size)), dtype=np.uint64)
+
+    for word in range(bitmaps.shape[1]):
+        bitmaps[:, word] = np.where(words == word, bits, 0).sum(axis=1, dtype=np.uint64)
+
+    return bitmaps
+
+
+def sample_bits(edges, positions):
+    edges = np.asarray(edges, dtype=np.uint64)
+    positions = np.asarray(positions, dtype=np.int64)
+    words = edges[..., positions // 64]
+
+    return (words >> (positions % 64).astype(np.uint64)) & np.uint64(1)
+
+
+def hash_keys(edges, positions):
+    bits = sample_bits(edges, positions)
+    weights = np.left_shift(np.uint64(1), np.arange(positions.shape[-1], dtype=np.uint64))
+
+    return (bits * weights).sum(axis=-1, dtype=np.uint64)
+
+
+def hamming_distances(edges, query):
+    return popcount(np.asarray(edges, dtype=np.uint64) ^ np.asarray(query, dtype=np.uint64)).sum(
+        axis=-1
+    )
+
+
+def build_similarity_index(
+    meta, columns, output_dir, tables=TABLES, bits=BITS_PER_TABLE, seed=SEED
+):
+    output_dir = Path(output_dir)
+    grid_size = meta["grid_size"]
+    count = meta["count"]
+
+    if bits > 63:
+        raise ValueError(f"BITS_PER_TABLE must be at most 63, got {bits}")
+
+    edges = np.zeros((count, edge_words(grid_size)), dtype=np.uint64)
+
+    for start in range(0, count, BUILD_CHUNK):
+        rows = np.arange(start, min(start + BUILD_CHUNK, count))
+        edges[rows] = edge_bitmaps(columns_vertices(meta, columns, rows), grid_size)
+
+    rng = np.random.default_rng(seed)
+    positions = np.stack(
+        [rng.choice(edge_count(grid_size), size=bits, replace=False) for _ in range(tables)]
+    ).astype(np.int64)
+
+    keys = np.zeros((tables, count), dtype=np.uint64)
+    rows = np.zeros((tables, count), dtype=np.uint32)
+
+    for table in range(tables):
+        table_keys = hash_keys(edges, positions[table])
+        order = np.argsort(table_keys, kind="stable")
+
+        keys[table] = table_keys[order]
+        rows[table] = order
+
+    arrays = {
+        "ids": np.asarray(columns["id"]).astype(np.uint32),
+        "edges": edges,
+        "positions": positions,
+        "keys": keys,
+        "rows": rows,
+    }
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    for name in INDEX_ARRAYS:
+        np.save(output_dir / f"{name}.npy", arrays[name])
+
+    index_meta = {
+        "version": FORMAT_VERSION,
+        "size": meta["size"],
+        "grid_size": grid_size,
+        "count": count,
+        "tables": tables,
+        "bits_per_table": bits,
+        "seed": seed,
+    }
+
+    with open(output_dir / META_NAME, "w", encoding="utf-8") as handle:
+        json.dump(index_meta, handle, indent=2)
+
+    return output_dir
+
+
+def load_similarity_index(similarity_dir):
+    similarity_dir = Path(similarity_dir)
+
+    with open(similarity_dir / META_NAME, "r", encoding="utf-8") as handle:
+        meta = json.load(handle)
+
+    if meta["version"] != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported similarity index version in {similarity_dir}: "
+            f"{meta['version']} != {FORMAT_VERSION}"
+        )
+
+    index = {
+        name: np.load(similarity_dir / f"{name}.npy", mmap_mode="r") for name in INDEX_ARRAYS
+    }
+    index["meta"] = meta
+
+    return index
+
+
+def probe_keys(key, bits, probes):
+    keys = [key]
+
+    if probes >= 1:
+        keys.extend(key ^ (1 << bit) for bit in range(bits))
+
+    return keys
+
+
+def candidate_rows(index, query, probes=0):
+    bits = index["meta"]["bits_per_table"]
+    query_keys = hash_keys(np.asarray(query)[None], np.asarray(index["positions"]))[0]
+    buckets = []
+
+    for table, key in enumerate(query_keys.tolist()):
+        table_keys = index["keys"][table]
+
+        for probe in probe_keys(key, bits, probes):
+            probe = np.uint64(probe)
+            low = np.searchsorted(table_keys, probe, side="left")
+            high = np.searchsorted(table_keys, probe, side="right")
+            buckets.append(index["rows"][table][low:high])
+
+    return np.unique(np.concatenate(buckets)) if buckets else np.zeros(0, dtype=np.uint32)
+
+
+def nearest_rows(index, query, k=DEFAULT_K, exclude_row=None):
+    # Widen to one-bit probes when the exact buckets hold too few paths.
+    for probes in (0, 1):
+        candidates = candidate_rows(index, query, probes)
+
+        if exclude_row is not None:
+            candidates = candidates[candidates != exclude_row]
+
+        if len(candidates) >= k:
+            break
+
+    distances = hamming_distances(index["edges"][candidates], query)
+    order = np.lexsort((candidates, distances))[:k]
+
+    return candidates[order], distances[order]
+
+
+def exact_nearest_rows(index, query, k=DEFAULT_K, exclude_row=None):
+    distances = hamming_distances(index["edges"], query)
+
+    if exclude_row is not None:
+        distances[exclude_row] = np.iinfo(distances.dtype).max
+
+    rows = np.lexsort((np.arange(len(distances)), distances))[:k]
+
+    return rows, distances[rows]
+
+
+def similar_ids(index, record_id, k=DEFAULT_K):
+    ids = np.asarray(index["ids"])
+    row = int(np.searchsorted(ids, record_id))
+
+    if row >= len(ids) or ids[row] != record_id:
+        raise ValueError(f"Record {record_id} is not in the similarity index")
+
+    rows, distances = nearest_rows(index, index["edges"][row], k, exclude_row=row)
+
+    return ids[rows], distances
+
+
+if __name__ == "__main__":
+    base_dir = Path(__file__).parent.parent.parent / str(SIZE)
+    similarity_dir = similarity_dir_for(base_dir, SIZE)
+
+    if not similarity_dir.exists():
+        columns_dir = columns_dir_for(base_dir, SIZE)
+
+        if not columns_dir.exists():
+            build_columnar_index(base_dir / f"{SIZE}.json", SIZE)
+
+        meta, columns = load_columns(columns_dir)
+        build_similarity_index(meta, columns, similarity_dir)
+
+    index = load_similarity_index(similarity_dir)
+    record_id = QUERY_ID if QUERY_ID is not None else int(index["ids"][0])
+
+    started = time.perf_counter()
+    ids, distances = similar_ids(index, record_id)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    print(f"{len(ids)} paths most similar to {record_id} ({elapsed:.2f} ms):")
+
+    for similar_id, distance in zip(ids.tolist(), distances.tolist()):
+        print(f"  {similar_id}: {distance} differing edges")
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+
+import json
+import mmap
+import os
+import time
+import xml.etree.ElementTree as ET
+from bisect import bisect_left
+from pathlib import Path
+import numpy as np
+
+# Configuration
+SIZE = 4
+ARCHIVE_TEMPLATE = "{size}.svgpack"
+MAGIC = b"NGSVGPK\0"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+QUERY_PREFIX = "sym_H/turns_10"
+
+SVG_NAMESPACE = "{http://www.w3.org/2000/svg}"
+
+# File layout: MAGIC, a little-endian uint64 header length, the JSON header,
+# then the sections below, each aligned to ALIGNMENT bytes. The header stores
+# every section's offset, dtype and length, so the reader maps them in place.
+#   ids               uint32, sorted record IDs (one row per record)
+#   offsets           uint64, row -> start of its SVG in "bodies" (count + 1)
+#   directories       uint32, row -> index into "directory_names"
+#   directory_rows    uint32, rows grouped by directory, IDs ascending
+#   directory_starts  uint64, directory -> first entry in directory_rows
+#   directory_names   uint8, sorted classification paths joined with "\n"
+#   bodies            uint8, the SVG files back to back in ID order
+SECTION_NAMES = [
+    "ids",
+    "offsets",
+    "directories",
+    "directory_rows",
+    "directory_starts",
+    "directory_names",
+    "bodies",
+]
+
+
+def archive_path_for(base_dir, size):
+    return Path(base_dir) / ARCHIVE_TEMPLATE.format(size=size)
+
+
+def svg_file_id(svg_file):
+    return int(Path(svg_file).stem.split("_", 1)[1])
+
+
+def scan_svg_tree(base_dir):
+    # os.scandir reuses the directory entries' cached stat data, so the scan
+    # costs one readdir per directory rather than one stat per file.
+    entries = []
+    pending = [Path(base_dir)]
+
+    while pending:
+        directory = pending.pop()
+
+        with os.scandir(directory) as scanner:
+            for entry in scanner:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(Path(entry.path))
+                elif entry.name.endswith(".svg"):
+                    entries.append((svg_file_id(entry.name), Path(entry.path)))
+
+    entries.sort()
+
+    return entries
+
+
+def aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def build_svg_archive(base_dir, size, archive_path=None):
+    base_dir = Path(base_dir)
+    archive_path = Path(archive_path or archive_path_for(base_dir, size))
+    entries = scan_svg_tree(base_dir)
+    ids = np.asarray([record_id for record_id, _ in entries], dtype=np.uint32)
+
+    if len(ids) and (np.diff(ids.astype(np.int64)) == 0).any():
+        duplicate = int(ids[np.nonzero(np.diff(ids.astype(np.int64)) == 0)[0][0]])
+        raise ValueError(f"Record {duplicate} appears more than once under {base_dir}")
+
+    relative_dirs = [svg_file.parent.relative_to(base_dir).as_posix() for _, svg_file in entries]
+    names = sorted(set(relative_dirs))
+    codes = {name: code for code, name in enumerate(names)}
+    directories = np.asarray([codes[name] for name in relative_dirs], dtype=np.uint32)
+    directory_rows = np.argsort(directories, kind="stable").astype(np.uint32)
+    directory_starts = np.searchsorted(
+        directories[directory_rows], np.arange(len(names) + 1)
+    ).astype(np.uint64)
+    sizes = [svg_file.stat().st_size for _, svg_file in entries]
+    offsets = np.concatenate([[0], np.cumsum(sizes, dtype=np.uint64)]).astype(np.uint64)
+
+    arrays = {
+        "ids": ids,
+        "offsets": offsets,
+        "directories": directories,
+        "directory_rows": directory_rows,
+        "directory_starts": directory_starts,
+        "directory_names": np.frombuffer("\n".join(names).encode("utf-8"), dtype=np.uint8),
+    }
+    sections = {}
+    position = 0
+
+    for name in SECTION_NAMES:
+        length = int(offsets[-1]) if name == "bodies" else len(arrays[name])
+        dtype = "uint8" if name == "bodies" else arrays[name].dtype.name
+        sections[name] = {"offset": position, "dtype": dtype, "length": length}
+        position = aligned(position + length * np.dtype(dtype).itemsize)
+
+    header = {
+        "version": FORMAT_VERSION,
+        "size": size,
+        "count": len(ids),
+        "directories": len(names),
+        "sections": sections,
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = aligned(len(MAGIC) + 8 + len(header_bytes))
+
+    archive_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(archive_path, "wb") as handle:
+        handle.write(MAGIC)
+        handle.write(len(header_bytes).to_bytes(8, "little"))
+        handle.write(header_bytes)
+
+        for name in SECTION_NAMES:
+            handle.seek(data_start + sections[name]["offset"])
+
+            if name != "bodies":
+                handle.write(np.ascontiguousarray(arrays[name]).tobytes())
+                continue
+
+            for (_, svg_file), expected in zip(entries, sizes):
+                body = svg_file.read_bytes()
+
+                if len(body) != expected:
+                    raise ValueError(f"{svg_file} changed while building the archive")
+
+                handle.write(body)
+
+    return archive_path
+
+
+def load_svg_archive(archive_path):
+    archive_path = Path(archive_path)
+
+    with open(archive_path, "rb") as handle:
+        buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if buffer[: len(MAGIC)] != MAGIC:
+        raise ValueError(f"{archive_path} is not an SVG archive")
+
+    header_length = int.from_bytes(buffer[len(MAGIC) : len(MAGIC) + 8], "little")
+    header = json.loads(buffer[len(MAGIC) + 8 : len(MAGIC) + 8 + header_length])
+
+    if header["version"] != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported SVG archive version in {archive_path}: "
+            f"{header['version']} != {FORMAT_VERSION}"
+        )
+
+    data_start = aligned(len(MAGIC) + 8 + header_length)
+    archive = {"meta": header, "buffer": buffer, "data_start": data_start}
+
+    for name, section in header["sections"].items():
+        archive[name] = np.frombuffer(
+            buffer,
+            dtype=section["dtype"],
+            count=section["length"],
+            offset=data_start + section["offset"],
+        )
+
+    archive["directory_names"] = archive["directory_names"].tobytes().decode("utf-8").split("\n")
+
+    return archive
+
+
+def archive_row(archive, record_id):
+    ids = archive["ids"]
+    row = int(np.searchsorted(ids, record_id))
+
+    if row >= len(ids) or ids[row] != record_id:
+        raise ValueError(f"Record {record_id} is not in the SVG archive")
+
+    return row
+
+
+def archive_svg(archive, record_id):
+    row = archive_row(archive, record_id)
+    start = archive["data_start"] + archive["meta"]["sections"]["bodies"]["offset"]
+
+    return archive["buffer"][
+        start + int(archive["offsets"][row]) : start + int(archive["offsets"][row + 1])
+    ]
+
+
+def load_archive_svg_path(archive, record_id):
+    root = ET.fromstring(archive_svg(archive, record_id))
+
+    return root.find(f".//{SVG_NAMESPACE}path")
+
+
+def archive_path_d(archive, record_id):
+    path_elem = load_archive_svg_path(archive, record_id)
+
+    if path_elem is None:
+        return None
+
+    return path_elem.get("d", "")
+
+
+def archive_directory(archive, record_id):
+    return archive["directory_names"][archive["directories"][archive_row(archive, record_id)]]
+
+
+def prefix_directories(archive, prefix):
+    # Names are sorted, so every directory at or below the prefix sits in one
+    # run starting where the prefix itself would be inserted.
+    names = archive["directory_names"]
+    prefix = prefix.strip("/")
+    codes = []
+
+    for code in range(bisect_left(names, prefix), len(names)):
+        name = names[code]
+
+        if not name.startswith(prefix):
+            break
+
+        if not prefix or name == prefix or name[len(prefix)] == "/":
+            codes.append(code)
+
+    return codes
+
+
+def prefix_ids(archive, prefix):
+    starts = archive["directory_starts"]
+    rows = [
+        archive["directory_rows"][int(starts[code]) : int(starts[code + 1])]
+        for code in prefix_directories(archive, prefix)
+    ]
+
+    if not rows:
+        return np.zeros(0, dtype=np.uint32)
+
+    return np.sort(archive["ids"][np.concatenate(rows)])
+
+
+def archive_files(archive):
+    # Relative paths shaped like the SVG tree, for code that reads features
+    # from the directory names or IDs from the file stem.
+    size = archive["meta"]["size"]
+    names = archive["directory_names"]
+
+    return [
+        Path(names[code]) / f"{size}_{record_id}.svg"
+        for record_id, code in zip(archive["ids"].tolist(), archive["directories"].tolist())
+    ]
+
+
+if __name__ == "__main__":
+    base_dir = Path(__file__).parent.parent.parent / str(SIZE)
+    archive_path = archive_path_for(base_dir, SIZE)
+
+    if not archive_path.exists():
+        build_svg_archive(base_dir, SIZE, archive_path)
+
+    started = time.perf_counter()
+    archive = load_svg_archive(archive_path)
+    ids = prefix_ids(archive, QUERY_PREFIX)
+    path_ds = [archive_path_d(archive, record_id) for record_id in ids.tolist()]
+    elapsed = (time.perf_counter() - started) * 1000
+
+    print(f"{archive['meta']['count']} SVGs in {archive_path.name}")
+    print(f"{len(path_ds)} paths under {QUERY_PREFIX} ({elapsed:.2f} ms)")
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import time
+from pathlib import Path
+import numpy as np
+from columnar_index import EXPOSURE_CLASSES, SYMMETRY_LABELS, TURN_DIRECTIONS
+from query_engine import FILTER_COLUMNS
+from svg_archive import scan_svg_tree
+
+# Configuration
+SIZE = 4
+MANIFEST_DIR_TEMPLATE = "{size}.manifest"
+META_NAME = "meta.json"
+FORMAT_VERSION = 1
+
+# One directory level per filter key, in FILTER_COLUMNS order.
+FEATURE_KEYS = list(FILTER_COLUMNS)
+FEATURE_VOCABULARIES = {
+    "sym": SYMMETRY_LABELS,
+    "exposure": EXPOSURE_CLASSES,
+    "turn": TURN_DIRECTIONS,
+}
+
+MANIFEST_ARRAYS = ["ids", "directories", "features"]
+
+
+def manifest_dir_for(base_dir, size):
+    return Path(base_dir) / MANIFEST_DIR_TEMPLATE.format(size=size)
+
+
+def tree_directories(base_dir):
+    base_dir = Path(base_dir)
+    directories = []
+    pending = [path for path in base_dir.glob("sym_*") if path.is_dir()]
+
+    while pending:
+        directory = pending.pop()
+        directories.append(directory.relative_to(base_dir).as_posix())
+
+        with os.scandir(directory) as scanner:
+            for entry in scanner:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(Path(entry.path))
+
+    return directories
+
+
+def tree_stamp(base_dir, size, directories=None):
+    # Every directory's mtime, so adding, removing or moving an SVG anywhere
+    # in the tree changes the stamp. Checking an existing stamp only stats the
+    # directories it lists plus the current sym_* roots; a new subdirectory
+    # shows up as a new mtime on its parent. base_dir itself is left out:
+    # writing the manifest (or any other index next to it) changes its mtime
+    # without touching the tree.
+    base_dir = Path(base_dir)
+    json_path = base_dir / f"{size}.json"
+
+    if directories is None:
+        directories = tree_directories(base_dir)
+    else:
+        directories = set(directories)
+        directories.update(path.name for path in base_dir.glob("sym_*") if path.is_dir())
+
+    mtimes = {}
+
+    for relative in sorted(directories):
+        try:
+            mtimes[relative] = os.stat(os.path.join(base_dir, relative)).st_mtime_ns
+        except FileNotFoundError:
+            mtimes[relative] = None
+
+    stamp = {"directories": mtimes, "json": None}
+
+    if json_path.exists():
+        stat = json_path.stat()
+        stamp["json"] = [stat.st_size, stat.st_mtime_ns]
+
+    return stamp
+
+
+def directory_features(name):
+    parts = name.split("/")
+
+    if len(parts) != len(FEATURE_KEYS):
+        raise ValueError(f"Unexpected classification directory: {name}")
+
+    features = {}
+
+    for key, part in zip(FEATURE_KEYS, parts):
+        if not part.startswith(f"{key}_"):
+            raise ValueError(f"Expected a {key}_ directory in {name}, got {part}")
+
+        value = part[len(key) + 1 :]
+        features[key] = value if key in FEATURE_VOCABULARIES else int(value)
+
+    return features
+
+
+def encode_features(features):
+    return [
+        FEATURE_VOCABULARIES[key].index(features[key])
+        if key in FEATURE_VOCABULARIES
+        else features[key]
+        for key in FEATURE_KEYS
+    ]
+
+
+def decode_features(codes):
+    return {
+        key: FEATURE_VOCABULARIES[key][code] if key in FEATURE_VOCABULARIES else code
+        for key, code in zip(FEATURE_KEYS, codes)
+    }
+
+
+def build_svg_manifest(base_dir, size, output_dir=None):
+    base_dir = Path(base_dir)
+    output_dir = Path(output_dir or manifest_dir_for(base_dir, size))
+    stamp = tree_stamp(base_dir, size)
+    entries = scan_svg_tree(base_dir)
+    relative_dirs = [svg_file.parent.relative_to(base_dir).as_posix() for _, svg_file in entries]
+    names = sorted(set(relative_dirs))
+    codes = {name: code for code, name in enumerate(names)}
+
+    arrays = {
+        "ids": np.asarray([record_id for record_id, _ in entries], dtype=np.uint32),
+        "directories": np.asarray([codes[name] for name in relative_dirs], dtype=np.uint32),
+        "features": np.asarray(
+            [encode_features(directory_features(name)) for name in names], dtype=np.int16
+        ).reshape(len(names), len(FEATURE_KEYS)),
+    }
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    for name in MANIFEST_ARRAYS:
+        np.save(output_dir / f"{name}.npy", arrays[name])
+
+    meta = {
+        "version": FORMAT_VERSION,
+        "size": size,
+        "count": len(entries),
+        "feature_keys": FEATURE_KEYS,
+        "vocabularies": FEATURE_VOCABULARIES,
+        "directory_names": names,
+        "stamp": stamp,
+    }
+
+    with open(output_dir / META_NAME, "w", encoding="utf-8") as handle:
+        json.dump(meta, handle)
+
+    return output_dir
+
+
+def load_svg_manifest(manifest_dir):
+    manifest_dir = Path(manifest_dir)
+
+    with open(manifest_dir / META_NAME, "r", encoding="utf-8") as handle:
+        meta = json.load(handle)
+
+    if meta["version"] != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported manifest version in {manifest_dir}: "
+            f"{meta['version']} != {FORMAT_VERSION}"
+        )
+
+    manifest = {
+        name: np.load(manifest_dir / f"{name}.npy", mmap_mode="r") for name in MANIFEST_ARRAYS
+    }
+    manifest["meta"] = meta
+
+    return manifest
+
+
+def svg_manifest(base_dir, size, refresh=False):
+    # Rebuilds when the manifest is missing, from an older format, or its
+    # stamp no longer matches the tree.
+    manifest_dir = manifest_dir_for(base_dir, size)
+    meta_path = manifest_dir / META_NAME
+
+    if not refresh and meta_path.exists():
+        with open(meta_path, "r", encoding="utf-8") as handle:
+            meta = json.load(handle)
+
+        if meta["version"] == FORMAT_VERSION and meta["stamp"] == tree_stamp(
+            base_dir, size, meta["stamp"]["directories"]
+        ):
+            return load_svg_manifest(manifest_dir)
+
+    return load_svg_manifest(build_svg_manifest(base_dir, size, manifest_dir))
+
+
+def manifest_files(manifest, base_dir, rows=None):
+    # Paths are only built for the requested rows; building all of them is
+    # the slowest part of a warm start.
+    base_dir = Path(base_dir)
+    size = manifest["meta"]["size"]
+    names = manifest["meta"]["directory_names"]
+    rows = slice(None) if rows is None else np.asarray(rows, dtype=np.int64)
+    ids = np.asarray(manifest["ids"])[rows].tolist()
+    codes = np.asarray(manifest["directories"])[rows].tolist()
+
+    return [
+        base_dir / names[code] / f"{size}_{record_id}.svg" for record_id, code in zip(ids, codes)
+    ]
+
+
+def manifest_features(manifest):
+    # Rows in the same directory share one feature dict.
+    features = [decode_features(codes) for codes in manifest["features"].tolist()]
+
+    return [features[code] for code in manifest["directories"].tolist()]
+
+
+def manifest_rows(manifest, filters):
+    # Filters are matched once per directory, then expanded to rows.
+    matches = np.ones(len(manifest["features"]), dtype=bool)
+
+    for key, allowed in filters.items():
+        if allowed is None:
+            continue
+
+        if key not in FEATURE_KEYS:
+            raise ValueError(f"Unknown filter key: {key}")
+
+        vocabulary = FEATURE_VOCABULARIES.get(key)
+        codes = [
+            vocabulary.index(value) if vocabulary is not None else value
+            for value in allowed
+            if vocabulary is None or value in vocabulary
+        ]
+        matches &= np.isin(manifest["features"][:, FEATURE_KEYS.index(key)], codes)
+
+    return np.nonzero(matches[np.asarray(manifest["directories"])])[0]
+
+
+if __name__ == "__main__":
+    base_dir = Path(__file__).parent.parent.parent / str(SIZE)
+
+    started = time.perf_counter()
+    manifest = svg_manifest(base_dir, SIZE)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    print(f"{manifest['meta']['count']} SVG files in the manifest ({elapsed:.0f} ms)")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+import numpy as np
+from path_store import columns_moves, moves_to_vertices
+
+SVG_TEMPLATE = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="{extent}" height="{extent}" '
+    'viewBox="0 0 {extent} {extent}">\n'
+    '  <path d="{d}" fill="none" stroke="currentColor" stroke-width="1" '
+    'stroke-linecap="square" stroke-linejoin="miter" />\n'
+    "</svg>\n"
+)
+
+
+def grid_to_svg_point(x, y):
+    return (2 * x + 0.5, 2 * y + 0.5)
+
+
+def point_tokens(grid_size):
+    tokens = []
+
+    for y in range(grid_size):
+        for x in range(grid_size):
+            px, py = grid_to_svg_point(x, y)
+            tokens.append(f"{px} {py}")
+
+    return tokens
+
+
+def vertices_to_d(vertices, grid_size, merge_collinear=False, tokens=None):
+    tokens = tokens or point_tokens(grid_size)
+    vertices = np.asarray(vertices)
+
+    if merge_collinear and len(vertices) > 2:
+        steps = np.diff(vertices, axis=0)
+        turns = np.any(steps[1:] != steps[:-1], axis=1)
+        keep = np.concatenate(([True], turns, [True]))
+        vertices = vertices[keep]
+
+    cells = vertices[:, 1].astype(np.int64) * grid_size + vertices[:, 0]
+    parts = [tokens[cell] for cell in cells]
+
+    return "M " + " L ".join(parts)
+
+
+def path_d(start_x, start_y, moves, grid_size, merge_collinear=False):
+    vertices = moves_to_vertices([start_x], [start_y], [moves])[0]
+
+    return vertices_to_d(vertices, grid_size, merge_collinear)
+
+
+def svg_document(d, grid_size):
+    return SVG_TEMPLATE.format(extent=2 * grid_size - 1, d=d)
+
+
+def columns_path_ds(meta, columns, rows, merge_collinear=False):
+    grid_size = meta["grid_size"]
+    tokens = point_tokens(grid_size)
+    moves = columns_moves(meta, columns, rows)
+    vertices = moves_to_vertices(columns["start_x"][rows], columns["start_y"][rows], moves)
+
+    return [vertices_to_d(row, grid_size, merge_collinear, tokens) for row in vertices]
+
+
+def columns_svg_documents(meta, columns, rows, merge_collinear=False):
+    return [
+        svg_document(d, meta["grid_size"])
+        for d in columns_path_ds(meta, columns, rows, merge_collinear)
+    ]
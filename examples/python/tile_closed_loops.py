@@ -1,9 +1,22 @@
 #!/usr/bin/env python3
 
-import json
 import xml.etree.ElementTree as ET
 from pathlib import Path
 import cairosvg
+import numpy as np
+from loop_catalogue import catalogue_loop_points, load_loop_catalogue, loops_dir_for
+from loop_signature import canonical_loop_signature, d4_canonical_signature
+from path_record import load_path_records
+from shape_bitmaps import (
+    ORIENTATION_NAMES,
+    best_orientation,
+    loop_bitmaps,
+    profile_histograms,
+    profile_order,
+    update_profile_histograms,
+)
+from svg_archive import archive_files, archive_path_for, load_svg_archive
+from svg_manifest import manifest_files, svg_manifest
 
 # Configuration
 SIZE = 4
@@ -11,6 +24,7 @@ TILE_COLUMNS = 12
 TILE_ROWS = 13
 OUTPUT_NAME = "tiled_closed_loops.png"
 MAX_ORIENTATION_PASSES = 50
+BITMAP_SIZE = 5
 
 TILE_SIZE = 11
 GAP = 1
@@ -23,34 +37,6 @@ TILE_BG_COLOR = "#f8f8f8"
 CANVAS_BG_COLOR = "white"
 
 
-def find_svg_files(base_path):
-    return list(Path(base_path).rglob("*.svg"))
-
-
-def load_metadata(json_path):
-    with open(json_path, "r", encoding="utf-8") as handle:
-        records = json.load(handle)
-
-    return {record["id"]: record for record in records}
-
-
-def get_manhattan(record):
-    if "distance" in record:
-        return record["distance"]["manhattan"]
-
-    return record["manhattan"]
-
-
-def get_start_end(record):
-    if "position" in record:
-        start = record["position"]["start"]
-        end = record["position"]["end"]
-
-        return start["x"], start["y"], end["x"], end["y"]
-
-    return record["x"], record["y"], record["end"]["x"], record["end"]["y"]
-
-
 def grid_to_svg_point(x, y):
     return (2 * x + 0.5, 2 * y + 0.5)
 
@@ -226,114 +212,14 @@ def transform_points(points, transform):
     return [transform(x, y) for x, y in points]
 
 
-def _point_on_segment(px, py, x1, y1, x2, y2, eps=1e-9):
-    if (
-        min(x1, x2) - eps <= px <= max(x1, x2) + eps
-        and min(y1, y2) - eps <= py <= max(y1, y2) + eps
-    ):
-        cross = (px - x1) * (y2 - y1) - (py - y1) * (x2 - x1)
-
-        return abs(cross) <= eps
-
-    return False
-
-
-def _point_in_polygon(px, py, polygon):
-    inside = False
-    count = len(polygon)
-
-    for i in range(count):
-        x1, y1 = polygon[i]
-        x2, y2 = polygon[(i + 1) % count]
-
-        if _point_on_segment(px, py, x1, y1, x2, y2):
-            return True
-
-        intersects = (y1 > py) != (y2 > py)
-
-        if intersects:
-            x_at_y = (x2 - x1) * (py - y1) / (y2 - y1) + x1
-
-            if px < x_at_y:
-                inside = not inside
-
-    return inside
-
-
-def points_to_bitmap(points):
-    bitmap_size = 5
-    bitmap = [[False] * bitmap_size for _ in range(bitmap_size)]
-
-    if not points:
-        return bitmap
-
-    xs = [p[0] for p in points]
-    ys = [p[1] for p in points]
+def orientation_bitmaps(base_data, grid_size, bitmap_size=BITMAP_SIZE):
+    if not base_data:
+        return np.zeros((0, len(ORIENTATION_NAMES)), dtype=np.uint64)
 
-    min_x, max_x = min(xs), max(xs)
-    min_y, max_y = min(ys), max(ys)
+    return loop_bitmaps(base_data, grid_size, bitmap_size)
 
-    width = max_x - min_x
-    height = max_y - min_y
 
-    if width <= 0 or height <= 0:
-        return bitmap
-
-    scale_x = width / bitmap_size
-    scale_y = height / bitmap_size
-
-    for row in range(bitmap_size):
-        for col in range(bitmap_size):
-            px = min_x + (col + 0.5) * scale_x
-            py = min_y + (row + 0.5) * scale_y
-
-            if _point_in_polygon(px, py, points):
-                bitmap[row][col] = True
-
-    return bitmap
-
-
-def hamming_similarity(bitmap1, bitmap2):
-    if not bitmap1 or not bitmap2:
-        return 0.0
-
-    total_cells = len(bitmap1) * len(bitmap1[0])
-    
-    matching_cells = sum(
-        cell1 == cell2
-        for row1, row2 in zip(bitmap1, bitmap2)
-        for cell1, cell2 in zip(row1, row2)
-    )
-
-    return matching_cells / total_cells
-
-
-def similarity_profile(bitmap, other_bitmaps):
-    if not other_bitmaps:
-        return ()
-
-    similarities = (hamming_similarity(bitmap, other) for other in other_bitmaps)
-
-    return tuple(-value for value in sorted(similarities, reverse=True))
-
-
-def choose_orientation(points, grid_size, existing_bitmaps):
-    _, best_points, best_bitmap = max(
-        (
-            (similarity_profile(bitmap, existing_bitmaps), transformed, bitmap)
-            for transform in d4_transforms(grid_size)
-            for transformed in [transform_points(points, transform)]
-            for bitmap in [points_to_bitmap(transformed)]
-        ),
-        key=lambda item: item[0],
-    )
-
-    return best_points, best_bitmap
-
-
-def compute_orientations(
-    selected_paths, metadata, grid_size, previous_orientations=None
-):
+def load_base_loops(selected_paths, metadata):
     base_data = []
 
     for svg_file in selected_paths:
@@ -343,8 +229,9 @@ def compute_orientations(
         if record is None:
             continue
 
-        moves = decode_path(record["path"], record["pathLen"])
-        start_x, start_y, end_x, end_y = get_start_end(record)
+        moves = decode_path(record.path_hex, record.path_length)
+        start_x, start_y = record.start_x, record.start_y
+        end_x, end_y = record.end_x, record.end_y
         closing_move = get_closing_move(start_x, start_y, end_x, end_y)
 
         if closing_move is None:
@@ -355,107 +242,50 @@ def compute_orientations(
     
         base_data.append(base_points)
 
-    if previous_orientations is None:
-        previous_orientations = [None] * len(base_data)
-
-    oriented_loops = []
-    oriented_bitmaps = []
-
-    identity_transform = d4_transforms(grid_size)[0]
-    all_bitmaps = [
-        (
-            prev_orientation[1]
-            if prev_orientation is not None
-            else points_to_bitmap(transform_points(base_points, identity_transform))
-        )
-        for base_points, prev_orientation in zip(base_data, previous_orientations)
-    ]
-
-    for idx, base_points in enumerate(base_data):
-        other_bitmaps = all_bitmaps[:idx] + all_bitmaps[idx + 1 :]
-
-        oriented_points, bitmap = choose_orientation(
-            base_points, grid_size, other_bitmaps
-        )
-
-        oriented_loops.append(oriented_points)
-        oriented_bitmaps.append(bitmap)
-    
-        all_bitmaps[idx] = bitmap
-
-    return oriented_loops, oriented_bitmaps
-
-
-def canonical_loop_signature(moves):
-    size = len(moves)
-
-    if size == 0:
-        return ()
-
-    rotations = [moves[i:] + moves[:i] for i in range(size)]
-    reversed_moves = [((move + 2) % 4) for move in reversed(moves)]
-    reversed_rotations = [reversed_moves[i:] + reversed_moves[:i] for i in range(size)]
-
-    candidates = rotations + reversed_rotations
-
-    return min(tuple(candidate) for candidate in candidates)
-
+    return base_data
 
-def apply_matrix(vec, matrix):
-    x, y = vec
-    a, b, c, d = matrix
-
-    return (a * x + b * y, c * x + d * y)
-
-
-def transform_moves(moves, matrix):
-    dir_to_vec = {
-        0: (1, 0),
-        1: (0, 1),
-        2: (-1, 0),
-        3: (0, -1),
-    }
-
-    vec_to_dir = {v: k for k, v in dir_to_vec.items()}
-
-    transformed = []
-
-    for move in moves:
-        vec = dir_to_vec[move]
-
-        transformed.append(vec_to_dir[apply_matrix(vec, matrix)])
-
-    return transformed
 
+def compute_orientations(
+    base_bitmaps,
+    orientations=None,
+    max_passes=MAX_ORIENTATION_PASSES,
+    bitmap_size=BITMAP_SIZE,
+):
+    base_bitmaps = np.asarray(base_bitmaps, dtype=np.uint64)
+    count = len(base_bitmaps)
 
-def d4_canonical_signature(moves):
-    rotations = [
-        (1, 0, 0, 1),
-        (0, -1, 1, 0),
-        (-1, 0, 0, -1),
-        (0, 1, -1, 0),
-    ]
+    if orientations is None:
+        orientations = np.zeros(count, dtype=np.int64)
 
-    mirror = (-1, 0, 0, 1)
+    orientations = np.array(orientations, dtype=np.int64)
+    current_bitmaps = base_bitmaps[np.arange(count), orientations]
+    histograms = profile_histograms(base_bitmaps, current_bitmaps, bitmap_size)
+    stale = np.ones(count, dtype=bool)
 
-    transforms = rotations[:]
+    for _ in range(max_passes):
+        if not stale.any():
+            break
 
-    for matrix in rotations:
-        a, b, c, d = matrix
-        ma, mb, mc, md = mirror
+        for idx in range(count):
+            if not stale[idx]:
+                continue
 
-        transforms.append(
-            (a * ma + b * mc, a * mb + b * md, c * ma + d * mc, c * mb + d * md)
-        )
+            stale[idx] = False
+            orientation = best_orientation(histograms[idx])
 
-    candidates = []
+            if orientation == orientations[idx]:
+                continue
 
-    for matrix in transforms:
-        transformed = transform_moves(moves, matrix)
+            bitmap = base_bitmaps[idx, orientation]
+            affected = update_profile_histograms(
+                histograms, base_bitmaps, idx, current_bitmaps[idx], bitmap, bitmap_size
+            )
 
-        candidates.append(canonical_loop_signature(transformed))
+            stale[affected] = True
+            orientations[idx] = orientation
+            current_bitmaps[idx] = bitmap
 
-    return min(candidates)
+    return orientations
 
 
 def create_tiled_png(loop_points, output_path, columns=TILE_COLUMNS, rows=TILE_ROWS):
@@ -524,89 +354,76 @@ if __name__ == "__main__":
     base_dir = Path(__file__).parent.parent.parent / str(SIZE)
     json_path = base_dir / f"{SIZE}.json"
 
-    metadata = load_metadata(json_path)
-    svg_files = find_svg_files(base_dir)
-
-    representative_by_signature = {}
-    moves_by_signature = {}
-
-    for svg_file in svg_files:
-        record_id = svg_id_from_path(svg_file)
-        record = metadata.get(record_id)
+    max_tiles = TILE_COLUMNS * TILE_ROWS
+    grid_size = SIZE + 2
+    loops_dir = loops_dir_for(base_dir, SIZE)
 
-        if record is None:
-            continue
+    if loops_dir.exists():
+        catalogue_meta, catalogue = load_loop_catalogue(loops_dir)
+        base_data = catalogue_loop_points(
+            catalogue_meta, catalogue, catalogue["d4_loops"][:max_tiles]
+        )
+    else:
+        metadata = load_path_records(json_path)
+        archive_path = archive_path_for(base_dir, SIZE)
 
-        if get_manhattan(record) != 1:
-            continue
+        if archive_path.exists():
+            svg_files = archive_files(load_svg_archive(archive_path))
+        else:
+            svg_files = manifest_files(svg_manifest(base_dir, SIZE), base_dir)
 
-        moves = decode_path(record["path"], record["pathLen"])
-        start_x, start_y, end_x, end_y = get_start_end(record)
-        closing_move = get_closing_move(start_x, start_y, end_x, end_y)
+        representative_by_signature = {}
+        moves_by_signature = {}
 
-        if closing_move is None:
-            continue
+        for svg_file in svg_files:
+            record_id = svg_id_from_path(svg_file)
+            record = metadata.get(record_id)
 
-        loop_moves = moves + [closing_move]
-        signature = canonical_loop_signature(loop_moves)
+            if record is None:
+                continue
 
-        if signature not in representative_by_signature:
-            representative_by_signature[signature] = svg_file
-            moves_by_signature[signature] = loop_moves
+            if record.manhattan != 1:
+                continue
 
-    representative_by_d4 = {}
+            moves = decode_path(record.path_hex, record.path_length)
+            start_x, start_y = record.start_x, record.start_y
+            end_x, end_y = record.end_x, record.end_y
+            closing_move = get_closing_move(start_x, start_y, end_x, end_y)
 
-    for signature, svg_file in representative_by_signature.items():
-        loop_moves = moves_by_signature[signature]
-        d4_signature = d4_canonical_signature(loop_moves)
+            if closing_move is None:
+                continue
 
-        representative_by_d4.setdefault(d4_signature, svg_file)
+            loop_moves = moves + [closing_move]
+            signature = canonical_loop_signature(loop_moves)
 
-    max_tiles = TILE_COLUMNS * TILE_ROWS
-    grid_size = SIZE + 2
+            if signature not in representative_by_signature:
+                representative_by_signature[signature] = svg_file
+                moves_by_signature[signature] = loop_moves
 
-    selected_paths = sorted(representative_by_d4.values(), key=svg_id_from_path)[
-        :max_tiles
-    ]
+        representative_by_d4 = {}
 
-    oriented_loops = []
-    oriented_bitmaps = []
-    previous_loops = None
-    previous_orientations = None
+        for signature, svg_file in representative_by_signature.items():
+            loop_moves = moves_by_signature[signature]
+            d4_signature = d4_canonical_signature(loop_moves)
 
-    for _ in range(MAX_ORIENTATION_PASSES):
-        new_loops, new_bitmaps = compute_orientations(
-            selected_paths, metadata, grid_size, previous_orientations
-        )
+            representative_by_d4.setdefault(d4_signature, svg_file)
 
-        if previous_loops is not None and new_loops == previous_loops:
-            oriented_loops = new_loops
-            oriented_bitmaps = new_bitmaps
+        selected_paths = sorted(representative_by_d4.values(), key=svg_id_from_path)[
+            :max_tiles
+        ]
 
-            break
+        base_data = load_base_loops(selected_paths, metadata)
 
-        previous_loops = new_loops
-        oriented_loops = new_loops
-        oriented_bitmaps = new_bitmaps
-        previous_orientations = list(zip(new_loops, new_bitmaps))
-
-    ranked_items = sorted(
-        (
-            (
-                similarity_profile(
-                    bitmap,
-                    oriented_bitmaps[:index] + oriented_bitmaps[index + 1 :],
-                ),
-                loop_points,
-            )
-            for index, (bitmap, loop_points) in enumerate(
-                zip(oriented_bitmaps, oriented_loops)
-            )
-        ),
-        key=lambda item: item[0],
-    )
+    base_bitmaps = orientation_bitmaps(base_data, grid_size)
+    orientations = compute_orientations(base_bitmaps)
+    transforms = d4_transforms(grid_size)
 
-    oriented_loops = [item[1] for item in ranked_items]
+    oriented_bitmaps = base_bitmaps[np.arange(len(base_bitmaps)), orientations]
+    oriented_loops = [
+        transform_points(base_points, transforms[orientation])
+        for base_points, orientation in zip(base_data, orientations)
+    ]
+    oriented_loops = [oriented_loops[idx] for idx in profile_order(oriented_bitmaps, BITMAP_SIZE)]
     output_path = Path(__file__).parent / OUTPUT_NAME
 
     create_tiled_png(oriented_loops, output_path, columns=TILE_COLUMNS, rows=TILE_ROWS)
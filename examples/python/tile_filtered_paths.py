@@ -4,6 +4,17 @@ import random
 import xml.etree.ElementTree as ET
 from pathlib import Path
 import cairosvg
+from columnar_index import columns_dir_for, load_columns
+from query_engine import build_query_index, query_rows
+from svg_archive import (
+    archive_files,
+    archive_path_for,
+    load_archive_svg_path,
+    load_svg_archive,
+    svg_file_id,
+)
+from svg_manifest import manifest_files, manifest_rows, svg_manifest
+from svg_render import columns_path_ds
 
 # Configuration
 SIZE = 4
@@ -54,10 +65,6 @@ FILTER_SETS = [
 ]
 
 
-def find_svg_files(base_path):
-    return list(Path(base_path).rglob("*.svg"))
-
-
 def load_svg_path(svg_file):
     tree = ET.parse(svg_file)
     root = tree.getroot()
@@ -65,6 +72,18 @@ def load_svg_path(svg_file):
     return root.find(".//{http://www.w3.org/2000/svg}path")
 
 
+def load_path_d(svg_file, archive=None):
+    if archive is None:
+        path_elem = load_svg_path(svg_file)
+    else:
+        path_elem = load_archive_svg_path(archive, svg_file_id(svg_file))
+
+    if path_elem is None:
+        return None
+
+    return path_elem.get("d", "")
+
+
 def parse_features(svg_path):
     features = {}
     parts = svg_path.parts
@@ -135,7 +154,7 @@ def matches_filters(features, filters):
     return True
 
 
-def create_tiled_png(svg_files, output_path, grid_size=GRID_SIZE):
+def create_tiled_png(path_ds, output_path, grid_size=GRID_SIZE):
     canvas_size = MARGIN * 2 + TILE_SIZE * grid_size + GAP * (grid_size - 1)
 
     ET.register_namespace("", "http://www.w3.org/2000/svg")
@@ -160,13 +179,11 @@ def create_tiled_png(svg_files, output_path, grid_size=GRID_SIZE):
         },
     )
 
-    for idx, svg_file in enumerate(svg_files[: grid_size * grid_size]):
+    for idx, path_d in enumerate(path_ds[: grid_size * grid_size]):
         x = MARGIN + (idx % grid_size) * (TILE_SIZE + GAP)
         y = MARGIN + (idx // grid_size) * (TILE_SIZE + GAP)
 
-        path_elem = load_svg_path(svg_file)
-
-        if path_elem is None:
+        if path_d is None:
             continue
 
         group = ET.SubElement(svg_root, "g", {"transform": f"translate({x}, {y})"})
@@ -181,7 +198,7 @@ def create_tiled_png(svg_files, output_path, grid_size=GRID_SIZE):
             group,
             "path",
             {
-                "d": path_elem.get("d", ""),
+                "d": path_d,
                 "fill": "none",
                 "stroke": STROKE_COLOR,
                 "stroke-width": "1",
@@ -197,16 +214,34 @@ def create_tiled_png(svg_files, output_path, grid_size=GRID_SIZE):
 
 if __name__ == "__main__":
     base_dir = Path(__file__).parent.parent.parent / str(SIZE)
-    svg_files = find_svg_files(base_dir)
+    columns_dir = columns_dir_for(base_dir, SIZE)
+    archive_path = archive_path_for(base_dir, SIZE)
+    query_index = None
+    archive = None
+    manifest = None
+
+    if columns_dir.exists():
+        meta, columns = load_columns(columns_dir)
+        query_index = build_query_index(meta, columns)
+    elif archive_path.exists():
+        archive = load_svg_archive(archive_path)
+        svg_files = archive_files(archive)
+    else:
+        manifest = svg_manifest(base_dir, SIZE)
 
     for index, filters in enumerate(FILTER_SETS, start=1):
-        filtered = []
+        if query_index is not None:
+            filtered = list(query_rows(query_index, filters))
+        elif manifest is not None:
+            filtered = manifest_files(manifest, base_dir, manifest_rows(manifest, filters))
+        else:
+            filtered = []
 
-        for svg_file in svg_files:
-            features = parse_features(svg_file)
+            for svg_file in svg_files:
+                features = parse_features(svg_file)
 
-            if matches_filters(features, filters):
-                filtered.append(svg_file)
+                if matches_filters(features, filters):
+                    filtered.append(svg_file)
 
         if len(filtered) < TILE_COUNT:
             raise ValueError(
@@ -215,6 +250,12 @@ if __name__ == "__main__":
             )
 
         selected = random.sample(filtered, TILE_COUNT)
+
+        if query_index is not None:
+            path_ds = columns_path_ds(meta, columns, selected)
+        else:
+            path_ds = [load_path_d(svg_file, archive) for svg_file in selected]
+
         output_path = Path(__file__).parent / OUTPUT_TEMPLATE.format(index=index)
 
-        create_tiled_png(selected, output_path)
+        create_tiled_png(path_ds, output_path)
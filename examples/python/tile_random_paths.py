@@ -4,6 +4,10 @@ import random
 import xml.etree.ElementTree as ET
 from pathlib import Path
 import cairosvg
+from columnar_index import columns_dir_for, load_columns
+from svg_archive import archive_path_d, archive_path_for, load_svg_archive
+from svg_manifest import manifest_files, svg_manifest
+from svg_render import columns_path_ds
 
 # Configuration
 SIZE = 4
@@ -20,10 +24,6 @@ TILE_BG_COLOR = "#f8f8f8"
 CANVAS_BG_COLOR = "white"
 
 
-def find_svg_files(base_path):
-    return list(Path(base_path).rglob("*.svg"))
-
-
 def load_svg_path(svg_file):
     tree = ET.parse(svg_file)
     root = tree.getroot()
@@ -31,7 +31,16 @@ def load_svg_path(svg_file):
     return root.find(".//{http://www.w3.org/2000/svg}path")
 
 
-def create_tiled_png(svg_files, output_path, grid_size=GRID_SIZE):
+def load_path_d(svg_file):
+    path_elem = load_svg_path(svg_file)
+
+    if path_elem is None:
+        return None
+
+    return path_elem.get("d", "")
+
+
+def create_tiled_png(path_ds, output_path, grid_size=GRID_SIZE):
     canvas_size = MARGIN * 2 + TILE_SIZE * grid_size + GAP * (grid_size - 1)
 
     ET.register_namespace("", "http://www.w3.org/2000/svg")
@@ -56,13 +65,11 @@ def create_tiled_png(svg_files, output_path, grid_size=GRID_SIZE):
         },
     )
 
-    for idx, svg_file in enumerate(svg_files[: grid_size * grid_size]):
+    for idx, path_d in enumerate(path_ds[: grid_size * grid_size]):
         x = MARGIN + (idx % grid_size) * (TILE_SIZE + GAP)
         y = MARGIN + (idx // grid_size) * (TILE_SIZE + GAP)
 
-        path_elem = load_svg_path(svg_file)
-
-        if path_elem is None:
+        if path_d is None:
             continue
 
         group = ET.SubElement(svg_root, "g", {"transform": f"translate({x}, {y})"})
@@ -77,7 +84,7 @@ def create_tiled_png(svg_files, output_path, grid_size=GRID_SIZE):
             group,
             "path",
             {
-                "d": path_elem.get("d", ""),
+                "d": path_d,
                 "fill": "none",
                 "stroke": STROKE_COLOR,
                 "stroke-width": "1",
@@ -93,8 +100,23 @@ def create_tiled_png(svg_files, output_path, grid_size=GRID_SIZE):
 
 if __name__ == "__main__":
     base_dir = Path(__file__).parent.parent.parent / str(SIZE)
-    svg_files = find_svg_files(base_dir)
-    selected = random.sample(svg_files, TILE_COUNT)
+    columns_dir = columns_dir_for(base_dir, SIZE)
+    archive_path = archive_path_for(base_dir, SIZE)
+
+    if columns_dir.exists():
+        meta, columns = load_columns(columns_dir)
+        selected = random.sample(range(meta["count"]), TILE_COUNT)
+        path_ds = columns_path_ds(meta, columns, selected)
+    elif archive_path.exists():
+        archive = load_svg_archive(archive_path)
+        selected = random.sample(archive["ids"].tolist(), TILE_COUNT)
+        path_ds = [archive_path_d(archive, record_id) for record_id in selected]
+    else:
+        manifest = svg_manifest(base_dir, SIZE)
+        rows = random.sample(range(manifest["meta"]["count"]), TILE_COUNT)
+        selected = manifest_files(manifest, base_dir, rows)
+        path_ds = [load_path_d(svg_file) for svg_file in selected]
+
     output_path = Path(__file__).parent / OUTPUT_NAME
 
-    create_tiled_png(selected, output_path)
+    create_tiled_png(path_ds, output_path)
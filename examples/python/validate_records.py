@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+
+import json
+import sys
+from itertools import chain
+from pathlib import Path
+import numpy as np
+from aggregate import FIELD_COLUMNS
+from columnar_index import TRANSFORM_NAMES, get_path_hex, invalid_value, rows_to_columns
+from d4 import dihedral_orbit_min, symmetry_labels, symmetry_properties, symmetry_transforms
+from features import derived_columns, is_canonical, segment_lengths, visits_every_vertex
+from path_store import HEX_DIGITS, moves_from_hex, moves_to_vertices
+
+# Configuration
+SIZE = 4
+MAX_REPORTED_IDS = 10
+
+FIELD_NAMES = {column: field for field, column in FIELD_COLUMNS.items()}
+FIELD_NAMES["segments_counts"] = "geometry.segments.counts"
+FIELD_NAMES["symmetry_transforms"] = "symmetry.transforms"
+
+
+def load_records(json_path):
+    with open(json_path, "r", encoding="utf-8") as handle:
+        records = json.load(handle)
+
+    # Records without a usable ID sort first; they are reported under "id".
+    records.sort(key=record_id)
+
+    return records
+
+
+def record_id(record):
+    value = record.get("id") if isinstance(record, dict) else None
+
+    return value if type(value) is int else -1
+
+
+def stored_value(record, keys):
+    # None when any key on the way is missing.
+    for key in keys:
+        if not isinstance(record, dict) or key not in record:
+            return None
+
+        record = record[key]
+
+    return record
+
+
+def stored_hex(record, width):
+    try:
+        hex_path = get_path_hex(record)[0]
+    except (KeyError, TypeError):
+        return ""
+
+    if not isinstance(hex_path, str) or len(hex_path) > width:
+        return ""
+
+    return hex_path if set(hex_path.lower()) <= set(HEX_DIGITS) else ""
+
+
+def record_moves(records, path_len):
+    # Moves are decoded straight from the hex, so a corrupt path (missing,
+    # reversing, too long, non-hex) becomes a row that fails path.hamiltonian
+    # instead of an exception from the packed encoding.
+    width = (path_len + 1) // 2
+
+    return moves_from_hex([stored_hex(record, width) for record in records], path_len)
+
+
+def stored_lengths(record):
+    lengths = stored_value(record, ("geometry", "segments", "lengths"))
+
+    if not isinstance(lengths, list):
+        return None
+
+    if not all(type(length) is int and 0 <= length <= 255 for length in lengths):
+        return None
+
+    return lengths
+
+
+def stored_properties(record):
+    properties = stored_value(record, ("symmetry", "properties"))
+
+    if not isinstance(properties, dict):
+        return None
+
+    flags = [properties.get(name) for name in TRANSFORM_NAMES]
+
+    return flags if all(type(flag) is bool for flag in flags) else None
+
+
+def segment_length_mismatches(records, moves, valid):
+    stored = [stored_lengths(records[row]) for row in np.flatnonzero(valid)]
+    readable = np.array([lengths is not None for lengths in stored], dtype=bool)
+    stored = [[] if lengths is None else lengths for lengths in stored]
+    stored_counts = np.array([len(lengths) for lengths in stored], dtype=np.int64)
+    stored_flat = np.fromiter(chain.from_iterable(stored), dtype=np.int64)
+
+    lengths, owners = segment_lengths(moves)
+    computed_counts = np.bincount(owners, minlength=len(stored))
+    same_count = readable & (stored_counts == computed_counts)
+
+    stored_selected = stored_flat[np.repeat(same_count, stored_counts)]
+    computed_selected = lengths[np.repeat(same_count, computed_counts)]
+    owners_selected = owners[np.repeat(same_count, computed_counts)]
+
+    bad = ~same_count
+    bad[owners_selected[stored_selected != computed_selected]] = True
+
+    return bad
+
+
+def partition_mismatches(reference, stored):
+    pairs = np.unique(np.column_stack([reference, stored]), axis=0)
+    references, reference_counts = np.unique(pairs[:, 0], return_counts=True)
+    values, value_counts = np.unique(pairs[:, 1], return_counts=True)
+
+    return np.isin(reference, references[reference_counts > 1]) | np.isin(
+        stored, values[value_counts > 1]
+    )
+
+
+def symmetry_mismatches(records, moves, vertices, ids, stored, valid, grid_size):
+    valid_ids = ids[valid]
+    transforms = symmetry_transforms(moves, vertices, valid_ids, grid_size)
+    stored_transforms = stored["symmetry_transforms"][valid]
+
+    # Images that are not valid rows cannot be looked up; keep the stored
+    # link so one corrupt record is reported once, not by every path in its
+    # orbit.
+    unchecked = (transforms == -1) & ~np.isin(stored_transforms, valid_ids)
+    transforms = np.where(unchecked, stored_transforms, transforms)
+    properties = symmetry_properties(transforms, valid_ids)
+    flags = [stored_properties(records[row]) for row in np.flatnonzero(valid)]
+    readable = np.array([row_flags is not None for row_flags in flags], dtype=bool)
+    flags = np.array(
+        [[False] * len(TRANSFORM_NAMES) if row_flags is None else row_flags for row_flags in flags],
+        dtype=bool,
+    ).reshape(-1, len(TRANSFORM_NAMES))
+
+    # A missing groups.dihedral is reported on its own row; it would split
+    # its orbit here.
+    orbits = dihedral_orbit_min(transforms, valid_ids)
+    groups = stored["groups_dihedral"][valid]
+    known = groups != invalid_value(groups.dtype)
+    partition = np.zeros(len(groups), dtype=bool)
+    partition[known] = partition_mismatches(orbits[known], groups[known])
+
+    return {
+        "symmetry.transforms": (transforms != stored_transforms).any(axis=1),
+        "symmetry.properties": ~readable | (properties != flags).any(axis=1),
+        "symmetry.label": symmetry_labels(properties) != stored["symmetry_label"][valid],
+        "groups.dihedral": partition,
+    }
+
+
+def validate_records(records, grid_size):
+    path_len = grid_size * grid_size - 1
+    stored = rows_to_columns(records, grid_size, strict=False)
+    ids = stored["id"]
+    moves = record_moves(records, path_len)
+    vertices = moves_to_vertices(stored["start_x"], stored["start_y"], moves)
+    mismatches = {}
+
+    mismatches["path.length"] = ids[stored["path_length"] != path_len]
+
+    valid = visits_every_vertex(vertices, grid_size)
+    mismatches["path.hamiltonian"] = ids[~valid]
+
+    # A row without a usable ID cannot be an image target, so it is left out
+    # of the cross-record checks like a broken path.
+    valid &= ids != invalid_value(ids.dtype)
+    mismatches["path.canonical"] = ids[~is_canonical(moves)]
+
+    valid_ids = ids[valid]
+    derived = derived_columns(moves[valid], vertices[valid], grid_size)
+
+    for name, computed in derived.items():
+        bad = computed != stored[name][valid]
+
+        if bad.ndim > 1:
+            bad = bad.any(axis=1)
+
+        mismatches[FIELD_NAMES[name]] = valid_ids[bad]
+
+    bad = segment_length_mismatches(records, moves[valid], valid)
+    mismatches["geometry.segments.lengths"] = valid_ids[bad]
+
+    symmetry = symmetry_mismatches(
+        records, moves[valid], vertices[valid], ids, stored, valid, grid_size
+    )
+
+    for field, bad in symmetry.items():
+        mismatches[field] = valid_ids[bad]
+
+    # Fields that were missing or did not fit their column hold the column's
+    # invalid value; rows that failed path.hamiltonian were not compared
+    # above, so they are added here.
+    for name, column in stored.items():
+        bad = column == invalid_value(column.dtype)
+
+        if bad.ndim > 1:
+            bad = bad.any(axis=1)
+
+        if bad.any():
+            field = FIELD_NAMES[name]
+            mismatches[field] = np.union1d(mismatches.get(field, ids[:0]), ids[bad])
+
+    return {field: field_ids for field, field_ids in mismatches.items() if len(field_ids)}
+
+
+def print_report(mismatches, count):
+    if not mismatches:
+        print(f"{count} records validated, no mismatches")
+        return
+
+    for field, field_ids in mismatches.items():
+        shown = ", ".join(str(record_id) for record_id in field_ids[:MAX_REPORTED_IDS])
+        more = " ..." if len(field_ids) > MAX_REPORTED_IDS else ""
+
+        print(f"{field}: {len(field_ids)} mismatches (ids: {shown}{more})")
+
+
+if __name__ == "__main__":
+    base_dir = Path(__file__).parent.parent.parent / str(SIZE)
+    records = load_records(base_dir / f"{SIZE}.json")
+    mismatches = validate_records(records, SIZE + 2)
+
+    print_report(mismatches, len(records))
+
+    if mismatches:
+        sys.exit(1)